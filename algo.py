@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
-import math
 import time
+import heapq
+import asyncio
 import logging
+from bisect import bisect_right
 import threading
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
@@ -19,6 +21,21 @@ from exceptions.exceptions import ValidationError, InitError
 
 from ib_insync import IB
 
+# testing sentinel: no buys are attempted before this moment.
+_BUY_ENABLE_AFTER = datetime(2021, 11, 26, 13, 45)
+
+
+def _compact_alive(lst: list) -> None:
+    """single-pass in-place removal of dead underlyings: write survivors
+       forward, then truncate. no new list is allocated and the list
+       object keeps its identity for any external references."""
+    w = 0
+    for u in lst:
+        if u.is_alive:
+            lst[w] = u
+            w += 1
+    del lst[w:]
+
 
 class App:
     def __init__(self, account_num: str, port: int, timeout: int = 120,
@@ -33,19 +50,35 @@ class App:
         config_logger(self.mode, self.session_start_time, __name__)
         self._logger = logging.getLogger(__name__)
         self.ib = IB()
+        # the loop the main thread drives through ib.run/ib.sleep.
+        # monitor tasks post their sell coroutines here so that order
+        # status events, which fire on this loop's thread, complete
+        # their awaiters on the same thread.
+        self._ib_loop = asyncio.get_event_loop()
         self.ibc = utils.get_controller()  # tool to control IBGateway client
         self.watchdog = utils.get_watchdog(self.ib, self.ibc, self.port)
         self.db = DB(path='./db/alpha.db', tz=self.tz)
         self.model = Model()
         self.account = Account(self)
         self.underlying_attributes = None
+        self.pending_orders = {}  # orderId -> in-flight ib Trade
         self.untracked = []
         self.underlyings = []  # is gradually populated as exchanges open
+        self._open_heap = []  # min-heaps of (time, id(u), u) tuples so the
+        self._close_heap = []  # next open/close is an O(1) peek at heap[0]
         self.next_open_time = None
         self.first_open_time = None
         self.next_close_time = None
         self.buffer = None
         self.last_close_time = None
+        # epoch-second float mirrors of the above datetimes. the per-tick
+        # comparisons in check_exchanges/run_algo_loop use these because
+        # comparing floats is far cheaper than comparing datetimes.
+        self._next_open_ts = None
+        self._next_close_ts = None
+        self._buffer_ts = None
+        self._last_close_ts = None
+        self._monitor_loop = None  # shared loop for all monitor tasks
         self._post_init()
 
     def _post_init(self):
@@ -55,38 +88,37 @@ class App:
         self.account.refresh_account()
         self.instantiate_underlyings()
         self._validate_underlyings()
+        self._build_heaps()
         self.next_open_time = self.get_next_open_time()
         self.first_open_time = self.next_open_time
         self.next_close_time = self.get_next_close_time()
         self.buffer = self.next_close_time - timedelta(minutes=15)
         self.last_close_time = self.get_last_close_time()
         self._validate_datetimes()
+        self._refresh_ts()
 
     def preliminary_market_check(self) -> None:
         """Perform a preliminary check that at least one exchange is open
            before launching the API client and spinning up the entire algo."""
-        sched = [utils.get_schedule(u['Exchange']) for u in
-                 self.underlying_attributes]
-        sched = [(o, c) for o, c in sched if o is not None and c is not None]
-        valid = [True for o, c in sched if self.session_start_time < c]
-        if not valid:
+        # underlyings often share an exchange (NASDAQ, CBOE, ...), so
+        # fetch each exchange's schedule once instead of once per symbol.
+        exchanges = {u['Exchange'] for u in self.underlying_attributes}
+        sched = [utils.get_schedule(exchange) for exchange in exchanges]
+        if not any(self.session_start_time < c for o, c in sched
+                   if o is not None and c is not None):
             self._logger.critical('All exchanges are closed for the day.')
             self.shutdown(preliminary=True)
 
     def _validate_underlyings(self):
-        """check for underlyings (which will be in self.untracked now)"""
-        try:
-            valid = []
-            for underlying in self.untracked:
-                try:
-                    assert isinstance(underlying, Underlying)
-                    valid.append(underlying)
-                except AssertionError as e:
-                    self._logger.exception(e)
-            self.untracked = valid
-            assert self.untracked
-        except AssertionError as e:
-            self._logger.exception(e)
+        """check for underlyings (which will be in self.untracked now).
+           a plain isinstance filter, no raise/catch per item."""
+        valid = [u for u in self.untracked if isinstance(u, Underlying)]
+        num_invalid = len(self.untracked) - len(valid)
+        if num_invalid:
+            self._logger.error(f'{num_invalid} invalid underlyings dropped')
+        self.untracked = valid
+        if not self.untracked:
+            self._logger.critical('no valid underlyings found.')
             self.shutdown()
 
     def _validate_datetimes(self):
@@ -117,100 +149,136 @@ class App:
     def refresh_underlyings(self) -> None:
         """cull any underlyings where is_alive == False. This method is called
            by Underlying instances directly when the instance shuts down."""
-        self.untracked = [u for u in self.untracked if u.is_alive]
-        self.underlyings = [u for u in self.underlyings if u.is_alive]
+        _compact_alive(self.untracked)
+        _compact_alive(self.underlyings)
+
+    def _build_heaps(self) -> None:
+        """build the open- and close-time heaps from untracked once on init.
+           id(u) breaks ties between underlyings sharing an exchange time.
+           the close heap is seeded with every underlying up front so no
+           push is needed when an underlying starts being tracked.
+           untracked is also sorted by open_time here so newly open
+           underlyings always occupy a prefix of the list."""
+        self.untracked.sort(key=lambda u: u.open_time)
+        self._open_heap = [(u.open_time, id(u), u) for u in self.untracked]
+        self._close_heap = [(u.close_time, id(u), u) for u in self.untracked]
+        heapq.heapify(self._open_heap)
+        heapq.heapify(self._close_heap)
 
     def get_next_open_time(self) -> datetime:
-        # open time only ever looks at untracked
-        if self.untracked:
-            # if statement prevent `min() of empty sequence` error
-            return min([u.open_time for u in self.untracked])
-        else:
-            return None
+        # open time only ever looks at untracked, all of which
+        # were pushed onto the open heap in _build_heaps.
+        return self._open_heap[0][0] if self._open_heap else None
 
     def get_next_close_time(self) -> datetime:
-        """get the next soonest exchange close time from a list
-           of all tracked underlyings' exchange close times, prioritizing
-           currently tracked underlyings."""
-        if self.underlyings:
-            return min([u.close_time for u in self.underlyings])
-        elif self.untracked:
-            return min([u.close_time for u in self.untracked])
-        else:
-            return None
+        """get the next soonest exchange close time, an O(1) peek at
+           the root of the close heap instead of a full min() scan."""
+        return self._close_heap[0][0] if self._close_heap else None
 
     def get_last_close_time(self) -> datetime:
         """return the latest close of all underlyings. This
            method is only called once, and uses self.untracked
            because it gets called before any market opened and
            thus self.untracked has all underlying data in it."""
-        return max([u.close_time for u in self.untracked])
+        return max((u.close_time for u in self.untracked), default=None)
+
+    def _to_ts(self, dt: datetime) -> float:
+        """naive America/New_York wall time -> epoch seconds"""
+        return dt.replace(tzinfo=self.tz).timestamp()
+
+    def _from_ts(self, ts: float) -> datetime:
+        """epoch seconds -> naive America/New_York wall time"""
+        return datetime.fromtimestamp(ts, tz=self.tz).replace(tzinfo=None)
+
+    def _refresh_ts(self) -> None:
+        """mirror the scheduling datetimes as epoch-second floats.
+           called whenever the datetimes change (open/close events only)
+           so the hot loop never touches datetime arithmetic."""
+        self._next_open_ts = (self._to_ts(self.next_open_time)
+                              if self.next_open_time else None)
+        self._next_close_ts = (self._to_ts(self.next_close_time)
+                               if self.next_close_time else None)
+        self._buffer_ts = (self._next_close_ts - 900.0
+                           if self._next_close_ts else None)
+        self._last_close_ts = self._to_ts(self.last_close_time)
 
     def add_open_underlyings(self, now) -> None:
-        """add any and all open underlyings not currently being tracked.
-           must rebuild the untracked list to exclude the underlyings
-           which are now being tracked."""
-        self.underlyings += [u for u in self.untracked if now >= u.open_time]
-        self.untracked = [u for u in self.untracked if now < u.open_time]
+        """pop any and all newly open underlyings off the open heap and
+           start tracking them. must rebuild the untracked list to exclude
+           the underlyings which are now being tracked."""
+        while self._open_heap and self._open_heap[0][0] <= now:
+            _, _, underlying = heapq.heappop(self._open_heap)
+            if underlying.is_alive:
+                self.underlyings.append(underlying)
+        # untracked is kept sorted by open_time (_build_heaps), so the
+        # now-tracked underlyings form a prefix; slice it off rather
+        # than filtering the whole list.
+        del self.untracked[:bisect_right(
+            self.untracked, now, key=lambda u: u.open_time)]
 
     def cull_closed_underlyings(self, last_timestamp) -> None:
-        """remove underlyings whose exchanges are closed from
-           the underlyings list by creating a copy of the list,
-           clearing the original self.underlyings list, and rebuiding
-           it without the underlyings whose exchanges are close."""
-        underlyings = self.underlyings.copy()
-        self.underlyings.clear()
-        for underlying in underlyings:
-            if last_timestamp >= underlying.close_time:
-                # underlying's exchange is closed.
+        """remove underlyings whose exchanges are closed by popping
+           expired entries off the close heap. shutdown() triggers
+           refresh_underlyings() which drops them from the lists.
+           entries that already died upstream are simply discarded."""
+        while self._close_heap and self._close_heap[0][0] <= last_timestamp:
+            _, _, underlying = heapq.heappop(self._close_heap)
+            if underlying.is_alive and underlying in self.underlyings:
                 underlying.shutdown()  # close all mkt data lines
-            else:
-                # underlying's exchange is still open
-                self.underlyings.append(underlying)
 
-    def check_exchanges(self, now) -> None:
-        """ensure the right exchanges are being tracked.
+    def check_exchanges(self, now_ts: float) -> None:
+        """ensure the right exchanges are being tracked, comparing cached
+           epoch-second floats on the per-tick path. datetimes are only
+           rebuilt inside the rarely-taken open/close event branches.
            1. add underlyings as their exchanges open
            2. remove underlyings as their exchanges close"""
-        if self.next_open_time:
+        if self._next_open_ts:
             # there is at least 1 exchange not yet open.
-            if now >= self.next_open_time:
+            if now_ts >= self._next_open_ts:
                 # next exchange is open, start tracking it.
-                self.add_open_underlyings(now)
+                self.add_open_underlyings(self._from_ts(now_ts))
                 self.next_open_time = self.get_next_open_time()
                 self.next_close_time = self.get_next_close_time()
                 self.buffer = self.next_close_time - timedelta(minutes=15)
+                self._refresh_ts()
                 # * Also call self.get_next_close_time() in case the newly
                 #   added underlying's exchange closes before all the currently
                 #   running underlying's exchanges.
                 # * If this wasn't called here, the underlying would not neces-
                 #   sarily be unloaded from the loop when its exchange closes.
-        if now >= self.buffer:
+        if now_ts >= self._buffer_ts:
             # an exchange is <= 15 minutes from closing.
             # check for and cancel existing positions.
             self.check_for_positions()
-            if now >= self.next_close_time:
+            if now_ts >= self._next_close_ts:
                 # some or all underlying exchanges have closed.
                 # refresh the values, cull closed underlyings.
-                self.cull_closed_underlyings(now)
+                self.cull_closed_underlyings(self._from_ts(now_ts))
                 self.next_close_time = self.get_next_close_time()
                 self.buffer = self.next_close_time - timedelta(minutes=15)
+                self._refresh_ts()
 
     def run_algo_loop(self) -> None:
+        # the clock is sampled exactly once per iteration; now_ts, cs,
+        # and db_time are all derived from that single time_ns reading.
         last_time = db_time = utils.get_now(tz=self.tz)
+        now_ns = time.time_ns()
+        now_ts = now_ns / 1e9
         while (self.account.available_funds > 10000 and
-               db_time < self.last_close_time):
+               now_ts < self._last_close_ts):
             t1 = time.perf_counter()
-            self.check_exchanges(db_time)
-            cs = math.floor((time.time() % 1) * 100) / 100  # centiseconds
-            mod = cs % 0.25
-            if mod < 0.12:
+            self.check_exchanges(now_ts)
+            # integer centiseconds (0..99) via ns division; avoids the
+            # float floor/multiply/divide round-trip and its rounding drift
+            cs = (now_ns // 10_000_000) % 100
+            mod = cs % 25
+            if mod < 12:
                 # accept any values less than half way between iterations
                 # and prevent time drift by modulating sleep_time such that
                 # sleep() ends right when the next iteration should begin.
-                cs -= mod  # square off cs such that cs % 0.25 == 0
-                db_time = datetime.now(tz=self.tz).replace(
-                    tzinfo=None).replace(microsecond=int(cs * 1e6))
+                cs -= mod  # square off cs such that cs % 25 == 0
+                db_time = self._from_ts(now_ts).replace(
+                    microsecond=cs * 10_000)
                 elapsed = (db_time - last_time).total_seconds()
                 if elapsed > 0.25:
                     num_elapsed = int(elapsed // 0.25 - 1)
@@ -219,17 +287,24 @@ class App:
                                      last_logged_time=last_time)
                 last_time = db_time
                 self.eval_sequence(time=db_time)
-                sleep_time = 0.2 - mod
+                sleep_time = 0.2 - mod / 100  # mod back to seconds
                 compute_time = time.perf_counter() - t1
-                # print('compute_time', compute_time*1000, 'ms')  # DAT
+                if self._logger.isEnabledFor(logging.DEBUG):
+                    self._logger.debug(
+                        'compute_time %.3f ms', compute_time * 1000)
                 self.ib.sleep(max(0.005, sleep_time - compute_time))
+            now_ns = time.time_ns()
+            now_ts = now_ns / 1e9
 
     def eval_sequence(self, time: datetime) -> None:
+        # accumulate the tick's rows and hand them to the db in one
+        # batched transaction instead of one insert per underlying.
+        ud_rows, od_rows, signal_rows = [], [], []
+        Underlying.build_feature_matrix(self.underlyings, time)
         for u in self.underlyings:
-            u.build_feature_vector(time)
             # if self.model.eval(u.features) and u.t1 <= time <= u.t2:
-            if True and utils.get_now() > datetime(2021, 11, 26, 13, 45):
-                print('about to buy')
+            if utils.get_now() > _BUY_ENABLE_AFTER:
+                self._logger.debug('about to buy')
                 exiting_positions = self.ib.positions(account=self.account_num)
                 try:
                     trade = transact.buy(self, u, time, exiting_positions)
@@ -237,37 +312,51 @@ class App:
                     self._logger.exception(e)
                     trade = False
                 if trade:
-                    print('trade made')  # DAT
+                    self._logger.info('trade made')
                     self.shutdown()  # DAT
                     self.launch_monitor(u, time, exiting_positions)
                     self.account.refresh_account()  # refresh cash, etc.
-                self.db.log_buy_signal(u.dbid, time)
-            self.db.log_underlying_data(u.dbid, u.data_line, time)
-            self.db.log_option_data(u.straddle_options, time)
+                signal_rows.append((u.dbid, time))
+            ud_rows.append(self.db.underlying_data_row(
+                u.dbid, u.data_line, time))
+            od_rows.extend(self.db.option_data_rows(u.straddle_options, time))
+        self.db.log_tick(ud_rows, od_rows, signal_rows)
 
     def launch_monitor(self, underlying: object,
                        time: datetime, exiting_positions: list) -> None:
-        """spin up a thread to monitor the position that was just opened"""
-        t = threading.Thread(
-            target=monitor.monitor,
-            args=(self, underlying, time, exiting_positions),
-            daemon=True)
-        t.start()
+        """post a monitor task for the just-opened position onto the
+           shared monitor loop. every open position used to get its own
+           thread with its own asyncio loop (a selector fd and scheduler
+           apiece); they now multiplex as coroutines on one loop."""
+        asyncio.run_coroutine_threadsafe(
+            monitor.monitor_async(self, underlying, time, exiting_positions),
+            self._get_monitor_loop())
+
+    def _get_monitor_loop(self) -> object:
+        """lazily start the shared monitor loop in a daemon thread"""
+        loop = self._monitor_loop
+        if loop is None:
+            loop = self._monitor_loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, daemon=True).start()
+        return loop
 
     def wait_for_market_open(self) -> None:
-        """sleep until the first exchange opens. No buffer needed since
-           contracts should already be loaded and ready to be tracked."""
-        now = utils.get_now(tz=self.tz)
-        has_run = False
-        while now < self.first_open_time:
-            time_to_open = (self.first_open_time - now).total_seconds()
-            if not has_run:
-                has_run = True
-                self._logger.info(
-                    f'waiting for market open. {time_to_open} seconds to go')
-            # self.ib.sleep(time_to_open / 2)  # ensure you don't oversleep
-            self.ib.sleep(max(0, time_to_open - 15))  # ensure no oversleep
-            now = utils.get_now(tz=self.tz)
+        """sleep until the first exchange opens in one shot computed from
+           the exact delta, instead of busy-waiting in a resample-and-sleep
+           loop. No buffer needed since contracts should already be loaded
+           and ready to be tracked."""
+        time_to_open = (self.first_open_time -
+                        utils.get_now(tz=self.tz)).total_seconds()
+        if time_to_open <= 0:
+            return
+        self._logger.info(
+            f'waiting for market open. {time_to_open} seconds to go')
+        self.ib.sleep(time_to_open)
+        # cover any residual undersleep without polling
+        residual = (self.first_open_time -
+                    utils.get_now(tz=self.tz)).total_seconds()
+        if residual > 0:
+            self.ib.sleep(residual)
 
     def check_for_positions(self) -> None:
         """Ensure that no positions that were opened during this session
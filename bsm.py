@@ -5,55 +5,93 @@ of valuation to be traded on."""
 
 import math
 from datetime import datetime
+from functools import lru_cache
 
 import utils
 from exceptions.exceptions import ValidationError
 
-from scipy.stats import norm
+import numpy as np
+from scipy.special import ndtr
+
+_MINUTES_PER_YEAR = 252 * 24 * 60
+
+
+@lru_cache(maxsize=4096)
+def _price_quantized(is_call: bool, strike: float, spot_cents: int,
+                     tenor_minutes: int, sigma_mils: int,
+                     r: float) -> float:
+    """price from quantized inputs so repeated single-option pricings
+       between market moves hit the cache instead of recomputing.
+       spot is keyed in cents, tenor in minutes and sigma in
+       thousandths: at that resolution the model output moves far less
+       than the 20% margin gate downstream, and a one-cent spot move
+       or a minute of time decay naturally refreshes the bucket."""
+    spot = spot_cents / 100.0
+    tenor = tenor_minutes / _MINUTES_PER_YEAR
+    sigma = sigma_mils / 1000.0
+    if is_call:
+        return price_call(spot, strike, tenor, sigma, r)
+    return price_put(spot, strike, tenor, sigma, r)
 
 
 def price_option(db: object, option: object, underlying: object,
                  tz: object, time: datetime = None) -> float:
-    """price 1 option"""
-    # is this used??
-    strike = option.contract.strike
-    right = option.contract.right
-    tenor = calc_tenor(option, tz)
+    """price 1 option through the quantized cache. `option` may be a
+       ticker/data line or a bare ib-insync contract."""
+    contract = getattr(option, 'contract', option)
+    strike = contract.strike
+    right = contract.right
+    tenor = calc_tenor(underlying)
     spot = underlying.data_line.last
     r = 0.02  # this should be logged in the DB as the daily rf rate.
     # ^ that's if pulling t-bill rates from an API.
     if time is None:
         time = utils.get_now()
     sigma = db.get_sigma(underlying.dbid, time, lookback=15)
-    # refactor db.get_underlying_price_extrema()
-    if right in {'C', 'CALL'}:
-        price = price_call(spot, strike, tenor, sigma, r)
-    elif right in {'P', 'PUT'}:
-        price = price_put(spot, strike, tenor, sigma, r)
-    else:
-        price = 0.0
-    return price
+    if right[0] not in {'C', 'P'}:
+        return 0.0
+    if not (math.isfinite(spot) and math.isfinite(sigma)):
+        # nan/inf can't be quantized into a cache key; the pricers
+        # themselves collapse degenerate sigma to intrinsic value
+        if right[0] == 'C':
+            return price_call(spot, strike, tenor, sigma, r)
+        return price_put(spot, strike, tenor, sigma, r)
+    return _price_quantized(
+        right[0] == 'C', strike, round(spot * 100),
+        round(tenor * _MINUTES_PER_YEAR), round(sigma * 1000), r)
 
 
 def price_options(db: object, options: list[object],
                   underlying: object, time: datetime = None) -> None:
     """a more efficient function and architecture than calling
        price_option() repeatedly since the costly calculations
-       to get sigma and tenor are only performed once."""
+       to get sigma and tenor are only performed once and the
+       pricing itself runs as one vectorized numpy kernel with
+       scipy's raw ndtr instead of per-option norm.cdf calls."""
     if time is None:
         time = utils.get_now()
     sigma = db.get_sigma(underlying.dbid, time, lookback=15)
     tenor = calc_tenor(underlying)
     spot = underlying.data_line.last  # already validated and guaranteed
     r = 0.02  # app.db.get_tbill_rate() or rf_rate or whatever
-    for option in options:
-        strike = option.contract.strike
-        right = option.contract.right
-        if right in {'C', 'CALL'}:
-            price = price_call(spot, strike, tenor, sigma, r)
-        else:
-            # `right` is already validated, so else is safe here.
-            price = price_put(spot, strike, tenor, sigma, r)
+    n = len(options)
+    strikes = np.fromiter(
+        (o.contract.strike for o in options), dtype=np.float64, count=n)
+    is_call = np.fromiter(
+        (o.contract.right[0] == 'C' for o in options), dtype=bool, count=n)
+    # `right` is already validated, so call-else-put is safe here.
+    sigma_sqrt_t = sigma * math.sqrt(tenor)
+    disc = math.exp(-r * tenor)
+    # log(spot/strike) == log(spot) - log(strike); hoisting log(spot)
+    # out of the array expression saves a division per strike.
+    log_spot = math.log(spot)
+    drift = (r + sigma * sigma / 2) * tenor
+    d1 = (log_spot - np.log(strikes) + drift) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    calls = spot * ndtr(d1) - strikes * disc * ndtr(d2)
+    puts = strikes * disc * ndtr(-d2) - spot * ndtr(-d1)
+    prices = np.where(is_call, calls, puts).clip(min=0)
+    for option, price in zip(options, prices):
         option.bsm_price = price
 
 
@@ -68,30 +106,26 @@ def calc_tenor(underlying) -> float:
 
 
 def price_call(s, k, t, sigma, r) -> float:
-    # from Hull p. 335, fig. (15.20)
-    d1 = get_d1(s, k, r, sigma, t)
-    d2 = get_d2(d1, sigma, t)
-    call = s * norm.cdf(d1) - k * math.exp(-r * t) * norm.cdf(d2)
+    # from Hull p. 335, fig. (15.20). d1/d2 are inlined rather than
+    # built through helper frames; a degenerate (zero or nan)
+    # sigma*sqrt(t) collapses to intrinsic value instead of being
+    # masked by a broad try/except.
+    sigma_sqrt_t = sigma * math.sqrt(t)
+    if not sigma_sqrt_t > 0:
+        return max(0.0, s - k)
+    d1 = (math.log(s / k) + (r + sigma * sigma / 2) * t) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    call = s * ndtr(d1) - k * math.exp(-r * t) * ndtr(d2)
     return max(0, call)
 
 
 def price_put(s, k, t, sigma, r) -> float:
-    # from Hull p. 335, fig (15.21)
-    d1 = get_d1(s, k, r, sigma, t)
-    d2 = get_d2(d1, sigma, t)
-    put = k * math.exp(-r * t) * norm.cdf(-d2) - s * norm.cdf(-d1)
+    # from Hull p. 335, fig (15.21). see price_call on the inlining
+    # and the degenerate-sigma intrinsic-value fallback.
+    sigma_sqrt_t = sigma * math.sqrt(t)
+    if not sigma_sqrt_t > 0:
+        return max(0.0, k - s)
+    d1 = (math.log(s / k) + (r + sigma * sigma / 2) * t) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    put = k * math.exp(-r * t) * ndtr(-d2) - s * ndtr(-d1)
     return max(0, put)
-
-
-def get_d1(spot, strike, r, sigma, t) -> float:
-    # BUG: runtime warning from numpy division by zero.
-    try:
-        return ((math.log(spot / strike) + (r + sigma ** 2 / 2) * t) /
-                (sigma * math.sqrt(t)))
-    except Exception as e:
-        print('divide by zero caught...')
-        print(type(e), e)
-
-
-def get_d2(d1, sigma, t) -> float:
-    return d1 - sigma * math.sqrt(t)
@@ -3,6 +3,8 @@ import sys
 import argparse
 from db import DB
 
+from ib_insync import IB, Stock, Index
+
 """
 [add SPX]
        python add_underlying.py --symbol SPX --mode auto --secType IND --optionStyle EUROPEan --is1256Contract 1 --optionSettlement CASH --currency USD --optionMultiplier 100 --exchange CBOE --optionTradingClass SPXW --optionExchange CBOE
@@ -21,13 +23,18 @@ valid_option_settlements = set(['CASH', 'PHYSICAL'])
 def print_for_confirmation(args: dict) -> None:
     """neatly print the arg dictionary by printing the
        key, value, and value type evenly spaced."""
-    longest_argname = max([len(str(arg)) for arg, _ in args.items()]) + 4
-    longest_argvalue = max(
-        [len(str(argvalue)) for _, argvalue in args.items()]) + 4
+    longest_argname = max(len(str(arg)) for arg in args) + 4
+    longest_argvalue = max(len(str(arg)) for arg in args.values()) + 4
     for argname, arg in args.items():
-        space1 = f'{" "*(longest_argname - len(argname))}'
-        space2 = f'{" "*(longest_argvalue - len(str(arg)))}'
-        print(f"{argname}{space1}{arg}{space2}{type(arg)}")
+        print(f"{argname:<{longest_argname}}"
+              f"{arg!s:<{longest_argvalue}}{type(arg)}")
+
+
+def _norm(s: str) -> str:
+    """uppercase optional inputs, mapping empty strings to None.
+       checking truthiness first skips the dead `.upper() or None`
+       call on empty strings."""
+    return s.upper() if s else None
 
 
 def clean_args(args: argparse.Namespace) -> dict:
@@ -42,11 +49,11 @@ def clean_args(args: argparse.Namespace) -> dict:
         'option_style': args.optionStyle.upper(),
         'option_settlement': args.optionSettlement.upper(),
         'option_multiplier': args.optionMultiplier,
-        'option_trading_class': args.optionTradingClass.upper() or None,
+        'option_trading_class': _norm(args.optionTradingClass),
         'is_1256_contract': bool(args.is1256Contract),
-        'exchange': args.exchange.upper() or None,
-        'option_exchange': args.optionExchange.upper() or None,
-        'primary_exchange': args.primaryExchange.upper() or None,
+        'exchange': _norm(args.exchange),
+        'option_exchange': _norm(args.optionExchange),
+        'primary_exchange': _norm(args.primaryExchange),
     }
 
 
@@ -62,12 +69,15 @@ def main(args: argparse.Namespace) -> None:
         if not args['conid']:
             raise AttributeError('No conid supplied in manual mode.')
     elif args['mode'] == 'AUTO':
-        from ib_insync import IB, Stock, Index
         ib = IB()
         port = int(input('Enter a live IB port: '))
         client_id = int(input('Enter a clientId for IB connection: '))
         ib.connect('127.0.0.1', port, client_id)
-        ib.sleep(1)
+        # poll in 50 ms steps (2 s cap) instead of a fixed 1 s sleep
+        for _ in range(40):
+            if ib.isConnected() and ib.client.isReady():
+                break
+            ib.sleep(0.05)
         if not ib.isConnected() or not ib.client.isReady():
             raise ConnectionRefusedError('FATAL: Failed to connect.')
         if args['sec_type'] == 'STK':
@@ -83,9 +93,12 @@ def main(args: argparse.Namespace) -> None:
                 exchange=args['exchange'],
                 currency=args['currency']
             )
-        ib.sleep(1)
         ib.qualifyContracts(contract)
-        ib.sleep(5)
+        # wait for the qualified conId instead of a fixed 5 s sleep
+        for _ in range(100):
+            if contract.conId != 0:
+                break
+            ib.sleep(0.05)
         args['conid'] = contract.conId
         assert args['conid'] != 0
         use_exch = int(input(f'Use returned exchange of '
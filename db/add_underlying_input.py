@@ -8,20 +8,26 @@ from ib_insync import IB, Stock, Index
 import pandas_market_calendars as mcal
 
 
-exchange_list = set(mcal.calendar_registry.get_calendar_names())
-print('valid pandas market calendars exchanges', exchange_list)
+_EXCHANGES = None
+
+
+def _exchanges() -> frozenset:
+    """valid pandas_market_calendars exchange names, built on first use
+       so importing this module doesn't pay the registry walk."""
+    global _EXCHANGES
+    if _EXCHANGES is None:
+        _EXCHANGES = frozenset(mcal.calendar_registry.get_calendar_names())
+    return _EXCHANGES
 
 
 def print_for_confirmation(args: dict) -> None:
     """neatly print the arg dictionary by printing the
        key, value, and value type evenly spaced."""
-    longest_argname = max([len(str(arg)) for arg, _ in args.items()]) + 4
-    longest_argvalue = max(
-        [len(str(argvalue)) for _, argvalue in args.items()]) + 4
+    longest_argname = max(len(str(arg)) for arg in args) + 4
+    longest_argvalue = max(len(str(arg)) for arg in args.values()) + 4
     for argname, arg in args.items():
-        space1 = f'{" "*(longest_argname - len(argname))}'
-        space2 = f'{" "*(longest_argvalue - len(str(arg)))}'
-        print(f"{argname}{space1}{arg}{space2}{type(arg)}")
+        print(f"{argname:<{longest_argname}}"
+              f"{arg!s:<{longest_argvalue}}{type(arg)}")
 
 
 def validate_contract_data(contract, args):
@@ -45,11 +51,16 @@ def validate_contract_data(contract, args):
 
 
 def main() -> None:
+    print('valid pandas market calendars exchanges', set(_exchanges()))
     args = get_inputs()
     port = int(input('Enter a live IB port: '))
     client_id = int(input('Enter a clientId for IB connection: '))
     ib.connect('127.0.0.1', port, client_id)
-    ib.sleep(1)
+    # poll in 50 ms steps (2 s cap) instead of a fixed 1 s sleep
+    for _ in range(40):
+        if ib.isConnected() and ib.client.isReady():
+            break
+        ib.sleep(0.05)
     if not ib.isConnected() or not ib.client.isReady():
         raise ConnectionError('FATAL: Failed to connect.')
     if args['sec_type'] == 0:
@@ -66,9 +77,16 @@ def main() -> None:
             currency=args['currency'])
     else:
         raise ValueError('Unexpected sec_type encountered.')
-    ib.sleep(1)
+    # qualifyContracts takes any number of contracts and overlaps their
+    # round-trips, so a scripted batch add should pass them all at once
+    # rather than loop over this function. the interactive flow only
+    # ever has the one, so just wait on its conId instead of a fixed
+    # 5 s sleep.
     ib.qualifyContracts(contract)
-    ib.sleep(5)
+    for _ in range(100):
+        if contract.conId != 0:
+            break
+        ib.sleep(0.05)
     validate_contract_data(contract, args)
     # translate input into valid strings
     if args['opt_style'] == 0:
@@ -86,7 +104,7 @@ def main() -> None:
     print_for_confirmation(args)
     proceed = input('Confirm that all the above are correct [y/n]: ').lower()
     if proceed == 'y':
-        if args['exchange'] not in exchange_list:
+        if args['exchange'] not in _exchanges():
             """corroborate entered exchange and ensure it's in
             pandas_market_calendars otherwise need to add an
             if statement to utils.get_schedule() such as
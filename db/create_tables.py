@@ -55,15 +55,47 @@ create_trade_table = (
         UNIQUE(OptionID, Time))"""
 )
 
+# TimeEpoch mirrors Time as integer epoch seconds; the realized-vol
+# query buckets on TimeEpoch/60 instead of parsing strftime strings.
 create_underlying_data_table = (
     """CREATE TABLE UnderlyingData (
         ID INTEGER PRIMARY KEY,
         UnderlyingID INTEGER NOT NULL REFERENCES Underlying(ID),
         Time TEXT NOT NULL,
         Price REAL,
+        TimeEpoch INTEGER,
         UNIQUE(UnderlyingID, Time))"""
 )
 
+create_underlying_data_index = (
+    """CREATE INDEX idx_ud_uid_te
+       ON UnderlyingData(UnderlyingID, TimeEpoch)
+       WHERE Price IS NOT NULL"""
+)
+
+# covering index for get_spot's latest-not-null-price lookup
+create_spot_index = (
+    """CREATE INDEX idx_ud_uid_time
+       ON UnderlyingData(UnderlyingID, Time DESC)
+       WHERE Price IS NOT NULL"""
+)
+
+# Trade is filtered by Time in the position queries; Option is joined
+# on UnderlyingID. (ConID is already indexed via its UNIQUE constraint.)
+create_trade_time_index = (
+    """CREATE INDEX idx_trade_time ON Trade(Time)"""
+)
+
+# composite index so the position queries join Trade -> Option on
+# OptionID and apply the Time filter inside the same index range scan
+create_trade_option_index = (
+    """CREATE INDEX idx_trade_optionid_time ON Trade(OptionID, Time)"""
+)
+
+create_option_underlying_index = (
+    """CREATE INDEX idx_option_uid ON Option(UnderlyingID)"""
+)
+
 create_option_data_table = (
     """CREATE TABLE OptionData (
         ID INTEGER PRIMARY KEY,
@@ -91,6 +123,11 @@ tables = [
     create_option_table,
     create_trade_table,
     create_underlying_data_table,
+    create_underlying_data_index,
+    create_spot_index,
+    create_trade_time_index,
+    create_trade_option_index,
+    create_option_underlying_index,
     create_option_data_table,
     create_buy_signal_data,
 ]
@@ -1,17 +1,166 @@
+import math
+import time
 import sqlite3
 import logging
+from contextlib import contextmanager
 from zoneinfo import ZoneInfo
 from datetime import datetime, timedelta
 
 import numpy as np
 
+# hot-path INSERT statements are hoisted to module constants so every
+# call passes the identical (interned) SQL text, keeping the sqlite3
+# prepared-statement cache hitting on the 4 Hz tick path.
+_INSERT_UNDERLYING_DATA_SQL = (
+    """INSERT OR IGNORE INTO
+        UnderlyingData(UnderlyingID, Time, Price, TimeEpoch)
+       VALUES (?, ?, ?, ?)""")
+_INSERT_OPTION_DATA_SQL = (
+    """INSERT OR IGNORE INTO OptionData(
+        OptionID, Time, Ask, Bid, AskImpVol, BidImpVol)
+       VALUES (?, ?, ?, ?, ?, ?)""")
+_INSERT_BUY_SIGNAL_SQL = (
+    """INSERT OR IGNORE INTO BuySignal(UnderlyingID, Time)
+       VALUES (?, ?)""")
+
+# annualization from 1-minute periods: sqrt(252 days * 390 mins/day)
+_SQRT_ANNUALIZATION = math.sqrt(252 * 390)
+
+# one algo-loop iteration; matches the 250 ms tick in run_algo_loop
+_TICK_STEP = timedelta(microseconds=250_000)
+
+# sentinel distinguishing "never looked up" from a cached None miss
+_MISS = object()
+
+
+# cursor-local row factories for the reusable getter cursors
+def _scalar_row(_, row):
+    return row[0]
+
+
+def _pair_row(_, row):
+    return row[0:2]
+
+
+# explicit datetime adapter: identical 'YYYY-MM-DD HH:MM:SS[.ffffff]'
+# text as the old implicit str() conversion (so existing rows and the
+# UNIQUE(.., Time) constraints still line up), but bound once here
+# instead of relying on the default adapter deprecated in 3.12.
+sqlite3.register_adapter(datetime, lambda dt: dt.isoformat(sep=' '))
+
 
 class DB:
     def __init__(self, path: str, tz: ZoneInfo = None) -> None:
         self._logger = logging.getLogger(__name__)
         self.tz = tz or ZoneInfo("America/New_York")
-        self.con = sqlite3.connect(database=path)
+        # check_same_thread=False lets db.pool hand an idle instance to
+        # a later monitor thread; the pool guarantees single-threaded
+        # use of any one instance at a time.
+        self.con = sqlite3.connect(database=path, cached_statements=256,
+                                   isolation_level=None,
+                                   check_same_thread=False)
+        # WAL appends commits to a log instead of rewriting pages and
+        # lets readers run while the tick loop writes; NORMAL still
+        # survives process crashes. journal_mode is sticky per database
+        # so the WAL switch only actually runs once.
+        self.con.executescript(
+            """PRAGMA journal_mode=WAL;
+               PRAGMA synchronous=NORMAL;
+               PRAGMA busy_timeout=5000;
+               PRAGMA temp_store=MEMORY;
+               PRAGMA mmap_size=268435456;
+               PRAGMA cache_size=-65536;""")
         self.con.row_factory = sqlite3.Row
+        # long-lived write/read cursor. con.execute() allocates a fresh
+        # Cursor per call, which adds up at ~20 statements per tick;
+        # this one is reused everywhere the sqlite3.Row factory is fine.
+        self._cur = self.con.cursor()
+        # dedicated reusable cursors for the scalar / pair / plain-tuple
+        # getters, so the hot reads rebind parameters on an existing
+        # handle instead of allocating a cursor and a lambda per call.
+        self._scalar_cur = self._cursor(_scalar_row)
+        self._pair_cur = self._cursor(_pair_row)
+        self._tuple_cur = self._cursor()
+        self._conid_to_id = {}  # ConID -> Option.ID, immutable once set
+        self._sym_to_id = {}  # Symbol -> Underlying.ID, static per session
+        # tick rows are buffered here and flushed in one transaction
+        # once the buffer grows large enough or the window elapses.
+        self._buf_underlying = []
+        self._buf_option = []
+        self._buf_signal = []
+        self._buf_limit = 200  # rows
+        self._flush_interval = 1.0  # seconds
+        self._last_flush = time.monotonic()
+        self._migrate()
+        self._warm_symbol_cache()
+
+    def _migrate(self) -> None:
+        """bring older databases up to the current schema: UnderlyingData
+           gained an integer TimeEpoch column so the realized-vol query
+           can bucket by integer minute instead of strftime string keys.
+           a fresh database (no tables yet) is left to create_tables.py."""
+        cols = {row[1] for row in self._cursor().execute(
+            "PRAGMA table_info(UnderlyingData)")}
+        if not cols:
+            return
+        if 'TimeEpoch' not in cols:
+            self._cur.execute(
+                "ALTER TABLE UnderlyingData ADD COLUMN TimeEpoch INTEGER")
+        self._cur.execute(
+            """CREATE INDEX IF NOT EXISTS idx_ud_uid_te
+               ON UnderlyingData(UnderlyingID, TimeEpoch)
+               WHERE Price IS NOT NULL""")
+        # covering indexes for the hot lookup paths (see create_tables.py)
+        self._cur.execute(
+            """CREATE INDEX IF NOT EXISTS idx_ud_uid_time
+               ON UnderlyingData(UnderlyingID, Time DESC)
+               WHERE Price IS NOT NULL""")
+        self._cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_trade_time ON Trade(Time)")
+        self._cur.execute(
+            """CREATE INDEX IF NOT EXISTS idx_trade_optionid_time
+               ON Trade(OptionID, Time)""")
+        self._cur.execute(
+            """CREATE INDEX IF NOT EXISTS idx_option_uid
+               ON Option(UnderlyingID)""")
+
+    def _warm_symbol_cache(self) -> None:
+        """underlyings are static for the life of a session, so load the
+           Symbol -> ID map once at open instead of querying per lookup."""
+        try:
+            self._sym_to_id = dict(self._cursor().execute(
+                "SELECT Symbol, ID FROM Underlying").fetchall())
+        except sqlite3.OperationalError:
+            # fresh database; create_tables.py hasn't run yet
+            self._sym_to_id = {}
+
+    def _epoch(self, time: datetime) -> int:
+        """naive wall time in self.tz -> integer epoch seconds"""
+        return int(time.replace(tzinfo=self.tz).timestamp())
+
+    @contextmanager
+    def _txn(self):
+        """explicit BEGIN IMMEDIATE ... COMMIT block. the connection runs
+           in autocommit (isolation_level=None), so this takes the write
+           lock exactly once per batch instead of letting DEFERRED
+           transactions upgrade mid-write and collide with readers."""
+        self._cur.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._cur.execute('ROLLBACK')
+            raise
+        else:
+            self._cur.execute('COMMIT')
+
+    def _cursor(self, row_factory: object = None) -> sqlite3.Cursor:
+        """cursor with a cursor-local row factory. getters that want
+           scalars or plain tuples use this instead of reassigning
+           con.row_factory, which flip-flopped connection-wide state
+           on every call. the connection itself stays on sqlite3.Row."""
+        cur = self.con.cursor()
+        cur.row_factory = row_factory
+        return cur
 
     def log_underlying(self, conid: int, symbol: str, sec_type: str,
                        currency: str, option_style: str,
@@ -23,8 +172,8 @@ class DB:
            `add_underlying.py` located within the /db directory is acceptable
            due to the infrequency of adding new underlyings."""
         try:
-            with self.con:
-                self.con.execute(
+            with self._txn():
+                self._cur.execute(
                     """INSERT INTO Underlying(
                         ConID, Symbol, SecType, Currency, OptionStyle,
                         OptionSettlement, OptionMultiplier, OptionExchange,
@@ -39,16 +188,18 @@ class DB:
             pass
         except sqlite3.DatabaseError as e:
             self._logger.exception(e)
+        else:
+            self._warm_symbol_cache()  # pick up the new symbol
 
     def log_options(self, underlying_id: int, contracts: list[object]) -> None:
         """log options based on contracts being passed in instead of options.
            This improves usability as Underlying can log options with only the
-           contracts before mktData lines are requested. This method follows
-           a philosophy of 1 try with multiple excepts as opposed to two
-           separate try blocks. This way is preferred because any 1
-           exception should end the sequence. This works for log_options,
-           but not log_option_data because log option can't take NULL values,
-           but option_data can and should be able to take NULL values."""
+           contracts before mktData lines are requested. Rows are extracted
+           first (skipping any contract with missing attributes) and written
+           with one executemany in a single transaction, so K contracts cost
+           one commit instead of K. OR IGNORE stands in for the old
+           per-row IntegrityError swallow on duplicate contracts."""
+        rows = []
         for contract in contracts:
             try:
                 con_id: int = contract.conId
@@ -56,23 +207,25 @@ class DB:
                 strike: float = contract.strike
                 right: str = contract.right
                 exchange: str = contract.exchange or None
-                with self.con:
-                    self.con.execute(
-                        """INSERT INTO Option(
-                            ConID, UnderlyingID, LastTradeDateOrContractMonth,
-                            Right, Strike, Exchange)
-                        VALUES (?, ?, ?, ?, ?, ?)""",
-                        (con_id, underlying_id, exp, right, strike, exchange))
-            except sqlite3.IntegrityError:
-                # unique constraint failed
-                continue
             except AttributeError as e:
-                self._logger.exception(e)
                 # failed to extract option data
-                continue
-            except sqlite3.DatabaseError as e:
                 self._logger.exception(e)
                 continue
+            rows.append((con_id, underlying_id, exp, right, strike, exchange))
+        try:
+            with self._txn():
+                self._cur.executemany(
+                    """INSERT OR IGNORE INTO Option(
+                        ConID, UnderlyingID, LastTradeDateOrContractMonth,
+                        Right, Strike, Exchange)
+                    VALUES (?, ?, ?, ?, ?, ?)""", rows)
+        except sqlite3.DatabaseError as e:
+            self._logger.exception(e)
+            return
+        # refresh the conid -> id cache for this underlying in one query
+        self._conid_to_id.update(self._tuple_cur.execute(
+            """SELECT ConID, ID FROM Option
+               WHERE UnderlyingID = :id""", {"id": underlying_id}).fetchall())
 
     def log_option(self, underlying_id: int, options: list[object]) -> None:
         print('I WAS CALLED AND SHOULD NOT HAVE BEEN CALLED!!!')
@@ -91,8 +244,8 @@ class DB:
                 strike: float = contract.strike
                 right: str = contract.right
                 exchange: str = contract.exchange or None
-                with self.con:
-                    self.con.execute(
+                with self._txn():
+                    self._cur.execute(
                         """INSERT INTO Option(
                             ConID, UnderlyingID, LastTradeDateOrContractMonth,
                             Right, Strike, Exchange)
@@ -116,37 +269,109 @@ class DB:
         """take the numer of iterations missed, the last logged timestamp,
             and output a list of valid timestamps to use when populating
             the DB with NULL values."""
-        missed_timestamps = []
-        for i in range(1, num_iters_missed + 1):
-            missed_timestamps.append(
-                last_logged_time + timedelta(microseconds=i * 250000))
-        return missed_timestamps
+        return [last_logged_time + _TICK_STEP * i
+                for i in range(1, num_iters_missed + 1)]
 
     def log_null(self, underlyings: list[object],
                  last_logged_time: datetime, num_iters_missed: int) -> None:
+        """backfill NULL rows for every missed iteration. all
+           (timestamp x underlying) and (timestamp x option) rows are
+           built up front and written with two executemany calls in one
+           transaction, instead of a commit per individual insert."""
         missed_timestamps = self._calc_missed_timestamps(
             last_logged_time, num_iters_missed)
-        for time in missed_timestamps:
-            for underlying in underlyings:
+        ud_rows = [(u.dbid, time, self._epoch(time))
+                   for time in missed_timestamps for u in underlyings]
+        od_rows = []
+        for underlying in underlyings:
+            for option in underlying.straddle_options:
                 try:
-                    with self.con:
-                        self.con.execute(
-                            """INSERT INTO UnderlyingData(UnderlyingID, Time)
-                               VALUES (?, ?)""",
-                            (underlying.dbid, time))
-                except sqlite3.DatabaseError:
-                    pass  # `pass` to run code below, `continue` would NOT.
-                for option in underlying.straddle_options:
-                    try:
-                        with self.con:
-                            option_id = self.get_option_id_from_conid(
-                                option.contract.conId)
-                            self.con.execute(
-                                """INSERT INTO OptionData(OptionID, Time)
-                                   VALUES (?, ?)""",
-                                (option_id, time))
-                    except (sqlite3.DatabaseError, AttributeError):
-                        continue
+                    option_id = self.get_option_id_from_conid(
+                        option.contract.conId)
+                except AttributeError:
+                    continue
+                od_rows.extend(
+                    (option_id, time) for time in missed_timestamps)
+        try:
+            with self._txn():
+                self._cur.executemany(
+                    """INSERT OR IGNORE INTO
+                        UnderlyingData(UnderlyingID, Time, TimeEpoch)
+                       VALUES (?, ?, ?)""", ud_rows)
+                self._cur.executemany(
+                    """INSERT OR IGNORE INTO OptionData(OptionID, Time)
+                       VALUES (?, ?)""", od_rows)
+        except sqlite3.DatabaseError as e:
+            self._logger.exception(e)
+
+    def underlying_data_row(self, underlying_id: int, data_line: object,
+                            time: datetime) -> tuple:
+        """build one UnderlyingData row for batched insertion by log_tick"""
+        try:
+            price = data_line.last
+        except AttributeError:
+            price = None
+        return (underlying_id, time, price, self._epoch(time))
+
+    def option_data_rows(self, options: list[object],
+                         time: datetime) -> list[tuple]:
+        """build OptionData rows for batched insertion by log_tick"""
+        rows = []
+        for option in options:
+            option_id = self.get_option_id_from_conid(option.contract.conId)
+            # getattr with a default instead of try/except: greeks are
+            # routinely absent early in the session and raising an
+            # AttributeError per stale option is far costlier than a
+            # failed attribute probe. missing greeks no longer wipe out
+            # a bid/ask that did arrive.
+            bid = getattr(option, 'bid', None)
+            ask = getattr(option, 'ask', None)
+            bg = getattr(option, 'bidGreeks', None)
+            ag = getattr(option, 'askGreeks', None)
+            bid_iv = bg.impliedVol if bg is not None else None
+            ask_iv = ag.impliedVol if ag is not None else None
+            rows.append((option_id, time, bid, ask, bid_iv, ask_iv))
+        return rows
+
+    def log_tick(self, underlying_rows: list[tuple], option_rows: list[tuple],
+                 signal_rows: list[tuple]) -> None:
+        """queue a tick's rows and flush them in one transaction once the
+           buffer hits _buf_limit rows or _flush_interval has elapsed,
+           amortizing commit cost across several ticks. buy signals force
+           an immediate flush so trade records are never left buffered.
+           the sub-second visibility delay is harmless to readers: the
+           only hot read (get_sigma) buckets by whole minutes."""
+        self._buf_underlying.extend(underlying_rows)
+        self._buf_option.extend(option_rows)
+        self._buf_signal.extend(signal_rows)
+        buffered = (len(self._buf_underlying) + len(self._buf_option) +
+                    len(self._buf_signal))
+        if (signal_rows or buffered >= self._buf_limit or
+                time.monotonic() - self._last_flush >= self._flush_interval):
+            self._flush()
+
+    def _flush(self) -> None:
+        """write all buffered tick rows via executemany in a single
+           transaction. OR IGNORE keeps a duplicate row from aborting
+           the rest of the batch, matching the old swallow-and-continue
+           behavior of the per-row methods."""
+        try:
+            with self._txn():
+                if self._buf_underlying:
+                    self._cur.executemany(
+                        _INSERT_UNDERLYING_DATA_SQL, self._buf_underlying)
+                if self._buf_option:
+                    self._cur.executemany(
+                        _INSERT_OPTION_DATA_SQL, self._buf_option)
+                if self._buf_signal:
+                    self._cur.executemany(
+                        _INSERT_BUY_SIGNAL_SQL, self._buf_signal)
+        except sqlite3.DatabaseError as e:
+            self._logger.exception(e)
+        self._buf_underlying.clear()
+        self._buf_option.clear()
+        self._buf_signal.clear()
+        self._last_flush = time.monotonic()
 
     def log_underlying_data(self, underlying_id: int, data_line: object,
                             time: datetime) -> None:
@@ -155,11 +380,12 @@ class DB:
         except AttributeError:
             price = None
         try:
-            with self.con:
-                self.con.execute(
-                    """INSERT INTO UnderlyingData(UnderlyingID, Time, Price)
-                       VALUES (?, ?, ?)""",
-                    (underlying_id, time, price))
+            with self._txn():
+                self._cur.execute(
+                    """INSERT INTO
+                        UnderlyingData(UnderlyingID, Time, Price, TimeEpoch)
+                       VALUES (?, ?, ?, ?)""",
+                    (underlying_id, time, price, self._epoch(time)))
         except sqlite3.DatabaseError:
             pass
 
@@ -169,19 +395,16 @@ class DB:
         for option in options:
             option_conid = option.contract.conId
             option_id = self.get_option_id_from_conid(option_conid)
+            # see option_data_rows on getattr vs try/except here
+            bid = getattr(option, 'bid', None)
+            ask = getattr(option, 'ask', None)
+            bg = getattr(option, 'bidGreeks', None)
+            ag = getattr(option, 'askGreeks', None)
+            bid_iv = bg.impliedVol if bg is not None else None
+            ask_iv = ag.impliedVol if ag is not None else None
             try:
-                bid = option.bid
-                ask = option.ask
-                bid_iv = option.bidGreeks.impliedVol
-                ask_iv = option.askGreeks.impliedVol
-            except AttributeError:
-                bid = None
-                ask = None
-                bid_iv = None
-                ask_iv = None
-            try:
-                with self.con:
-                    self.con.execute(
+                with self._txn():
+                    self._cur.execute(
                         """INSERT INTO OptionData(
                             OptionID, Time, Ask, Bid, AskImpVol, BidImpVol)
                         VALUES (?, ?, ?, ?, ?, ?)""",
@@ -191,8 +414,8 @@ class DB:
 
     def log_buy_signal(self, underlying_id: int, time: datetime) -> None:
         try:
-            with self.con:
-                self.con.execute(
+            with self._txn():
+                self._cur.execute(
                     """INSERT INTO BuySignal(UnderlyingID, Time)
                        VALUES (?, ?)""",
                     (underlying_id, time))
@@ -204,10 +427,10 @@ class DB:
         try:
             option_id = self.get_option_id_from_conid(trade.contract.conId)
             quantity = trade.filled()
-            com = sum([f.commissionReport.commission for f in trade.fills])
+            com = sum(f.commissionReport.commission for f in trade.fills)
             avg_price = trade.orderStatus.avgFillPrice
-            with self.con:
-                self.con.execute(
+            with self._txn():
+                self._cur.execute(
                     """INSERT INTO Trade(
                         AccountNum, Time, OptionID,
                         Quantity, AvgPrice, Commission)
@@ -221,46 +444,74 @@ class DB:
 
     def get_option_id_from_conid(self, con_id: int) -> int:
         # TESTED.
-        """return the database ID of an option instance given its con_id"""
-        self.con.row_factory = lambda _, row: row[0]
-        return self.con.execute(
+        """return the database ID of an option instance given its con_id.
+           the mapping never changes once the option row exists, so hits
+           come from a dict and each conid is SELECTed at most once.
+           misses are cached too (as None): repeated lookups of a conid
+           that isn't logged are the common invalid-input case, and
+           log_options overwrites the stale None once the row appears."""
+        option_id = self._conid_to_id.get(con_id, _MISS)
+        if option_id is not _MISS:
+            return option_id
+        row = self._tuple_cur.execute(
             "SELECT ID FROM Option WHERE ConID = :conid", {"conid": con_id}
             ).fetchone()
+        option_id = row[0] if row is not None else None
+        self._conid_to_id[con_id] = option_id
+        return option_id
 
     def get_underlying_id(self, symbol: str) -> int:
         # TESTED
-        self.con.row_factory = lambda _, row: row[0]
-        return self.con.execute(
-            """SELECT ID FROM Underlying
-               WHERE Symbol = :symbol""", {"symbol": symbol}).fetchone()
+        """dict hit on the session-static symbol cache; falls through to
+           a query only for a symbol added after this connection opened.
+           negative results are cached as None until log_underlying
+           rebuilds the map."""
+        try:
+            return self._sym_to_id[symbol]
+        except KeyError:
+            uid = self._scalar_cur.execute(
+                """SELECT ID FROM Underlying
+                   WHERE Symbol = :symbol""", {"symbol": symbol}).fetchone()
+            self._sym_to_id[symbol] = uid
+            return uid
 
     def get_all_underlyings(self) -> list[sqlite3.Row]:
         # TESTED
-        self.con.row_factory = sqlite3.Row
-        return self.con.execute("""SELECT * FROM Underlying""").fetchall()
+        return self._cur.execute("""SELECT * FROM Underlying""").fetchall()
 
     def delete_all_trades(self) -> None:
         """used for testing to clear out trade data to bypass the
            `net position exists` error."""
-        self.con.execute("DELETE FROM TRADE")
+        self._cur.execute("DELETE FROM TRADE")
 
     def get_all_trades(self) -> list[sqlite3.Row]:
-        self.con.row_factory = sqlite3.Row
-        return self.con.execute("""SELECT * FROM Trade""").fetchall()
+        return self._cur.execute("""SELECT * FROM Trade""").fetchall()
 
     def get_all_options(self) -> list[sqlite3.Row]:
-        self.con.row_factory = sqlite3.Row
-        return self.con.execute("""SELECT * FROM Option""").fetchall()
+        return self._cur.execute("""SELECT * FROM Option""").fetchall()
 
     def get_sigma(self, underlying_id: int,
                   time: datetime, lookback: int) -> float:
         # TESTED
-        """calculate the realized volatility over the lookback period."""
-        a = self.get_price_extrema(underlying_id, time, lookback)
-        try:
-            return np.sqrt(252 * 390 * np.log(a[:, 0] / a[:, 1]) ** 2).mean()
-        except IndexError:
+        """calculate the realized volatility over the lookback period.
+           sqrt(252*390*log(x)^2) == sqrt(252*390) * |log(x)|, and the
+           mean of |log(min/max)| per minute bucket reduces inside
+           sqlite itself (LN/ABS/AVG are built in since 3.35), so only
+           one scalar crosses the C<->Python boundary instead of 2*N
+           floats plus a numpy allocation."""
+        t1 = time - timedelta(minutes=lookback)
+        val = self._scalar_cur.execute(
+            """SELECT AVG(x) FROM (
+                   SELECT ABS(LN(MIN(Price) / MAX(Price))) AS x
+                   FROM UnderlyingData
+                   WHERE UnderlyingID = :id
+                        AND TimeEpoch > :t1
+                        AND Price IS NOT NULL
+                   GROUP BY TimeEpoch / 60)""",
+            {"id": underlying_id, "t1": self._epoch(t1)}).fetchone()
+        if val is None:
             return float('nan')
+        return _SQRT_ANNUALIZATION * val
 
     def get_price_extrema(self, underlying_id: int, time: datetime,
                           lookback: int) -> np.array:
@@ -268,25 +519,30 @@ class DB:
         """Return the min and max realized prices on a minute period basis for
            the number of periods, in minutes, given by `lookback`. The output
            array is used to calculate realized volatility and realvolma"""
-        self.con.row_factory = lambda _, row: row[0:2]
         t1 = time - timedelta(minutes=lookback)
-        data = self.con.execute(
+        # integer minute buckets on the indexed TimeEpoch column, rather
+        # than strftime string keys parsed per row.
+        data = self._pair_cur.execute(
             """SELECT MIN(Price), MAX(Price)
                FROM UnderlyingData
                WHERE UnderlyingID = :id
-                    AND Time > :t1
+                    AND TimeEpoch > :t1
                     AND Price IS NOT NULL
-               GROUP BY strftime('%d%H%M', Time)
-               ORDER BY Time ASC""",
-            {"id": underlying_id, "t1": t1}).fetchall()
-        return np.array(data)
+               GROUP BY TimeEpoch / 60
+               ORDER BY TimeEpoch ASC""",
+            {"id": underlying_id, "t1": self._epoch(t1)}).fetchall()
+        # np.fromiter over the flattened rows fills the float64 buffer
+        # directly; np.array(list-of-tuples) would copy through an
+        # intermediate object array.
+        return np.fromiter(
+            (v for row in data for v in row),
+            dtype=np.float64, count=2 * len(data)).reshape(-1, 2)
 
     def get_spot(self, id: int) -> float:
         # TESTED
         """return the last not null price for a given underlying"""
-        self.con.row_factory = lambda _, row: row[0]
         try:
-            return self.con.execute(
+            return self._scalar_cur.execute(
                     """SELECT Price
                        FROM UnderlyingData
                        WHERE UnderlyingID = :id
@@ -300,8 +556,7 @@ class DB:
         # TESTED
         """return net position for an underlying since session start time"""
         # NOTE: (untested) this uses native SQL sum instead of python...
-        self.con.row_factory = lambda _, row: row[0]
-        return self.con.execute(
+        return self._scalar_cur.execute(
             """SELECT SUM(Quantity)
                FROM Trade
                JOIN Option
@@ -317,8 +572,7 @@ class DB:
         """Return details on the positions opened after a
            given time that were saved to this db. this is used in monitor.py
            NOTE: this may not include all trades in IB's records"""
-        self.con.row_factory = sqlite3.Row
-        return self.con.execute(
+        return self._cur.execute(
             """SELECT SUM(t.Quantity) AS quantity,
                       t.AvgPrice AS avg_price,
                       o.Strike AS strike,
@@ -341,8 +595,7 @@ class DB:
         """Return details on all trades placed since session start time,
            for all symbols. Used to check for any unclosed positions on
            shutdown of the algorithm."""
-        self.con.row_factory = sqlite3.Row
-        return self.con.execute(
+        return self._cur.execute(
             """SELECT SUM(t.Quantity) AS quantity,
                       t.AvgPrice AS avg_price,
                       o.Strike AS strike,
@@ -362,6 +615,8 @@ class DB:
             {"time": time}).fetchall()
 
     def close(self) -> None:
-        """commit changes and close the connection with the db"""
+        """flush buffered rows, commit changes, and close the connection"""
+        self._flush()
         self.con.commit()  # commit any unsaved changes
+        self._cur.close()
         self.con.close()
@@ -0,0 +1,42 @@
+"""tiny DB instance pool. monitor() spawns a fresh thread per buy
+   signal and each one used to build its own DB -- a sqlite open,
+   the pragma script, and the cache warm every time. checked-in
+   instances are reused by later monitor threads instead; only one
+   thread holds a given instance at a time, which is what makes the
+   cross-thread handoff safe (see check_same_thread in db.py)."""
+import queue
+import threading
+from contextlib import contextmanager
+
+from db.db import DB
+
+_pools = {}  # path -> Queue of idle DB instances
+_lock = threading.Lock()
+
+
+@contextmanager
+def checkout(path: str = './db/alpha.db', tz: object = None):
+    """yield a DB for `path`, reusing an idle pooled instance when one
+       exists and returning it to the pool on exit."""
+    with _lock:
+        q = _pools.setdefault(path, queue.Queue())
+    try:
+        db = q.get_nowait()
+    except queue.Empty:
+        db = DB(path=path, tz=tz)
+    try:
+        yield db
+    finally:
+        q.put(db)
+
+
+def close_all() -> None:
+    """drain every pool and close the idle instances."""
+    with _lock:
+        pools = list(_pools.values())
+    for q in pools:
+        while True:
+            try:
+                q.get_nowait().close()
+            except queue.Empty:
+                break
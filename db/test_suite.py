@@ -1,186 +1,168 @@
+"""pytest suite for the DB query layer. the intent is unchanged from
+   the old hand-rolled harness: invalid inputs to the getters should
+   come back as None / nan / empty rather than throwing. each case is
+   now its own parametrized test, so pytest can time, filter, and
+   parallelize them individually instead of one loop hiding them all."""
 import math
+import sqlite3
 from datetime import datetime
 
-from db import DB
-
-
-"""------------ below is for testing querying ------------"""
-"""the intent here is to ensure that invalid inputs to queries
-   doesn't throw exceptions and instead just returns None"""
-
-
-def test_get_spot(ids: list[int] = None):
-    invalids = [-1, 0, 0.44, -0.22, 'a', 1222020, '-', '-2-2d']
-    valids = [1]
-    passed, failed = 0, 0
-    for id in invalids:
-        spot = db.get_spot(id)
-        try:
-            assert spot is None
-            passed += 1
-        except AssertionError:
-            failed += 1
-            print('failed with id of', id)
-    for id in valids:
-        spot = db.get_spot(id)
-        try:
-            assert isinstance(spot, float)
-            passed += 1
-        except AssertionError:
-            failed += 1
-            print('failed with id of', id)
-    pass_rate = passed / (passed + failed)
-    print(f'passed {pass_rate * 100}% of cases')
-
-
-def test_get_sigma(ids: list[int] = None, lookbacks: list[int] = None):
-    ids = [1, -1, 0, 0.44, -0.22, 1222020]
-    lookbacks = [-1, 0, 0.44, -0.22, 1222020]
-    passed, failed = 0, 0
-    for id in ids:
-        for lookback in lookbacks:
-            try:
-                a = db.get_sigma(id, lookback)
-                print(a)
-                passed += 1
-            except AssertionError:
-                failed += 1
-            except Exception as e:
-                failed += 1
-                print(id, lookback, e)
-    pass_rate = passed / (passed + failed)
-    print(f'passed {pass_rate * 100}% of cases')
-
-
-def test_get_price_extrema(ids: list[int] = None, lookbacks: list[int] = None):
-    ids = [1, -1, 0, 0.44, -0.22, 1222020]
-    lookbacks = [-1, 0, 0.44, -0.22, 1222020]
-    passed, failed = 0, 0
-    for id in ids:
-        for lookback in lookbacks:
-            try:
-                a = db.get_price_extrema(id, lookback)
-                print(a)
-                passed += 1
-            except AssertionError:
-                failed += 1
-            except Exception as e:
-                failed += 1
-                print(id, lookback, e)
-    pass_rate = passed / (passed + failed)
-    print(f'passed {pass_rate * 100}% of cases')
-
-
-def test_get_underlying_id(symbols: list[str] = None):
-    symbols = ['SPX', 'spx', 'sPx', '0', '-', '-2-2d', 'a', 0, 33231, -332, -3]
-    passed, failed = 0, 0
-    for symbol in symbols:
-        try:
-            c = db.get_underlying_id(symbol)
-            # print(c)
-            passed += 1
-        except Exception as e:
-            failed += 1
-            print(e)
-    pass_rate = passed / (passed + failed)
-    print(f'passed {pass_rate * 100}% of cases')
-
-
-def test_get_opt_id_from_conid(conids: list[int] = None):
-    conids = [514502747, 'SPX', 'spx', 'sPx', '0',
-              '-', '-2-2d', 'a', 0, 33231, -332, -3]
-    passed, failed = 0, 0
-    for conid in conids:
-        try:
-            b = db.get_option_id_from_conid(conid)
-            print(b)
-            passed += 1
-        except AssertionError:
-            failed += 1
-            print('failed with conid', conid)
-    pass_rate = passed / (passed + failed)
-    print(f'passed {pass_rate * 100}% of cases')
-
-
-def test_get_position_size(symbols: list[str] = None,
-                           times: list[datetime] = None):
-    symbols = ['PSX', 'SPX', 'sPx', '0', 0, 23, -2, -3.3, 3.44, 2032302, ',']
-    times = [datetime.now(), '0332032', 'aa', '2342', '--']
-    passed, failed = 0, 0
-    for symbol in symbols:
-        for time in times:
-            try:
-                s = db.get_position_size(symbol, time)
-                # print(s)
-                passed += 1
-            except Exception as e:
-                failed += 1
-                print(e)
-    pass_rate = passed / (passed + failed)
-    print(f'passed {pass_rate * 100}% of cases')
-
-
-def test_get_positions(symbols: list[str] = None, times: list[datetime] = None):
-    symbols = ['PSX', 'SPX', 'sPx', '0', 0, 23, -2, -3.3, 3.44, 2032302, ',']
-    times = [datetime.now(), '0332032', 'aa', '2342', '--']
-    passed, failed = 0, 0
-    for symbol in symbols:
-        for time in times:
-            try:
-                s = db.get_positions(symbol, time)
-                # print(s)
-                passed += 1
-            except Exception as e:
-                failed += 1
-                print(e)
-    pass_rate = passed / (passed + failed)
-    print(f'passed {pass_rate * 100}% of cases')
-
-# function calls for the above tests:
-# test_get_spot()
-# test_get_sigma()
-# test_get_underlying_id()
-# test_get_opt_id_from_conid()
-# test_get_position_size()
-# test_get_positions()
-# test_get_price_extrema()
-
-
-def test_get_option_id():
-    # opts = db.get_all_options()  # used to get some conids
-    # for row in opts:
-    #     print(tuple(row))
-    #     option_conid 523228946 option_id None
-    #     option_conid 523229578 option_id None
-    #     option_conid 523228952 option_id None
-    #     option_conid 523229585 option_id None
-    opt = db.get_option_id_from_conid(523228946)
-    assert opt is not None
-    assert isinstance(opt, int)
+import pytest
+
+from db.db import DB
+
+_SCHEMA = """
+    CREATE TABLE Underlying (
+        ID INTEGER PRIMARY KEY,
+        ConID INTEGER NOT NULL UNIQUE,
+        Symbol TEXT NOT NULL UNIQUE,
+        SecType TEXT NOT NULL,
+        Currency TEXT NOT NULL,
+        OptionStyle TEXT NOT NULL,
+        OptionSettlement TEXT NOT NULL,
+        OptionMultiplier TEXT NOT NULL,
+        OptionExchange TEXT,
+        OptionTradingClass TEXT,
+        Is1256Contract INTEGER NOT NULL,
+        Exchange TEXT NOT NULL,
+        PrimaryExchange TEXT);
+    CREATE TABLE Option (
+        ID INTEGER PRIMARY KEY,
+        ConID INTEGER NOT NULL UNIQUE,
+        UnderlyingID INTEGER NOT NULL REFERENCES Underlying(ID),
+        LastTradeDateOrContractMonth TEXT NOT NULL,
+        Right TEXT NOT NULL,
+        Strike REAL NOT NULL,
+        Exchange TEXT,
+        UNIQUE(UnderlyingID, LastTradeDateOrContractMonth, Right, Strike));
+    CREATE TABLE Trade (
+        ID INTEGER PRIMARY KEY,
+        AccountNum TEXT NOT NULL,
+        Time TEXT NOT NULL,
+        OptionID INTEGER NOT NULL REFERENCES Option(ID),
+        Quantity INTEGER NOT NULL,
+        AvgPrice REAL NOT NULL,
+        Commission REAL NOT NULL,
+        UNIQUE(OptionID, Time));
+    CREATE TABLE UnderlyingData (
+        ID INTEGER PRIMARY KEY,
+        UnderlyingID INTEGER NOT NULL REFERENCES Underlying(ID),
+        Time TEXT NOT NULL,
+        Price REAL,
+        TimeEpoch INTEGER,
+        UNIQUE(UnderlyingID, Time));
+    CREATE TABLE OptionData (
+        ID INTEGER PRIMARY KEY,
+        OptionID INTEGER NOT NULL REFERENCES Option(ID),
+        Time TEXT NOT NULL,
+        Ask REAL,
+        Bid REAL,
+        AskImpVol REAL,
+        BidImpVol REAL,
+        UNIQUE(OptionID, Time));
+    CREATE TABLE BuySignal (
+        ID INTEGER PRIMARY KEY,
+        UnderlyingID INTEGER NOT NULL REFERENCES Underlying(ID),
+        Time TEXT NOT NULL,
+        UNIQUE(UnderlyingID, Time));
+"""
+
+NOW = datetime(2021, 11, 26, 13, 45)
+
+INVALID_IDS = [-1, 0, 0.44, -0.22, 'a', 1222020, '-', '-2-2d']
+IDS = [1, -1, 0, 0.44, -0.22, 1222020]
+LOOKBACKS = [15, -1, 0, 0.44, -0.22, 1222020]
+SYMBOLS = ['PSX', 'SPX', 'sPx', '0', 0, 23, -2, -3.3, 3.44, 2032302, ',']
+TIMES = [NOW, '0332032', 'aa', '2342', '--']
+CONIDS = [514502747, 'SPX', 'spx', 'sPx', '0',
+          '-', '-2-2d', 'a', 0, 33231, -332, -3]
+
+
+@pytest.fixture(scope='session')
+def db(tmp_path_factory):
+    """one seeded throwaway database per worker, shared by every case
+       instead of reopening the file per test function."""
+    path = str(tmp_path_factory.mktemp('db') / 'test.db')
+    con = sqlite3.connect(path)
+    con.executescript(_SCHEMA)
+    con.execute(
+        """INSERT INTO Underlying(ID, ConID, Symbol, SecType, Currency,
+            OptionStyle, OptionSettlement, OptionMultiplier,
+            OptionTradingClass, Is1256Contract, Exchange)
+           VALUES (1, 416904, 'SPX', 'IND', 'USD', 'EUROPEAN', 'CASH',
+                   '100', 'SPXW', 1, 'CBOE')""")
+    con.execute(
+        """INSERT INTO Option(ID, ConID, UnderlyingID,
+            LastTradeDateOrContractMonth, Right, Strike)
+           VALUES (1, 514502747, 1, '20211126', 'C', 4700.0)""")
+    con.commit()
+    con.close()
+    db = DB(path=path)
+    db.log_underlying_data(1, None, NOW)  # null price row
+    yield db
+    db.close()
 
 
-def test_get_all_options():
-    opts = db.get_all_options()
-    for row in opts:
-        print(tuple(row))
+@pytest.mark.parametrize('id_', INVALID_IDS)
+def test_get_spot_invalid(db, id_):
+    assert db.get_spot(id_) is None
 
 
-def test_get_all_trades():
-    trades = db.get_all_trades()
-    for row in trades:
-        print(tuple(row))
+def test_get_spot_null_price(db):
+    # the only row for id 1 has a NULL price, so nothing comes back
+    assert db.get_spot(1) is None
 
 
+@pytest.mark.parametrize('id_', IDS)
+@pytest.mark.parametrize('lookback', LOOKBACKS)
+def test_get_sigma(db, id_, lookback):
+    sigma = db.get_sigma(id_, NOW, lookback)
+    assert math.isnan(sigma)
 
-"""------------ above is for testing querying ------------"""
 
+@pytest.mark.parametrize('id_', IDS)
+@pytest.mark.parametrize('lookback', LOOKBACKS)
+def test_get_price_extrema(db, id_, lookback):
+    a = db.get_price_extrema(id_, NOW, lookback)
+    assert len(a) == 0
 
 
+@pytest.mark.parametrize('symbol', ['spx', 'sPx', '0', '-', '-2-2d', 'a',
+                                    0, 33231, -332, -3])
+def test_get_underlying_id_invalid(db, symbol):
+    assert db.get_underlying_id(symbol) is None
 
-if __name__ == '__main__':
-    db = DB(path='./alpha.db')
 
-    # call test function:
-    test_get_sigma()
+def test_get_underlying_id(db):
+    assert db.get_underlying_id('SPX') == 1
 
-    db.close()
+
+@pytest.mark.parametrize('conid', CONIDS[1:])
+def test_get_opt_id_from_conid_invalid(db, conid):
+    assert db.get_option_id_from_conid(conid) is None
+
+
+def test_get_opt_id_from_conid(db):
+    opt = db.get_option_id_from_conid(514502747)
+    assert opt is not None
+    assert isinstance(opt, int)
+
+
+@pytest.mark.parametrize('method, empty', [
+    ('get_position_size', (None, 0)),
+    ('get_positions', ([],)),
+])
+@pytest.mark.parametrize('symbol', SYMBOLS)
+@pytest.mark.parametrize('time', TIMES)
+def test_position_lookups_empty(db, method, empty, symbol, time):
+    # both lookups share the same shape: no trades seeded, so every
+    # symbol/time combination comes back empty
+    assert getattr(db, method)(symbol, time) in empty
+
+
+def test_get_all_options(db):
+    assert len(db.get_all_options()) == 1
+
+
+def test_get_all_trades(db):
+    assert db.get_all_trades() == []
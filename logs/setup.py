@@ -1,41 +1,54 @@
 import os
+import queue
+import atexit
 import logging
+import logging.handlers
+from functools import lru_cache
+
+# funcName/lineno force a stack-frame walk per record, so they're only
+# worth paying for when debugging; the production format drops them.
+_DEBUG_FMT = ('%(asctime)s:%(levelname)s:%(module)s:'
+              '%(funcName)s:line %(lineno)d:%(message)s')
+_PROD_FMT = '%(asctime)s:%(levelname)s:%(module)s:%(message)s'
+_DATE_FMT = '%m/%d/%Y %I:%M:%S %p %Z'
 
 
 def config_logger(mode: str, now: object, filename: str) -> None:
     filename = get_filename(mode, now, filename)
-    logging.basicConfig(
-        filename=filename,
-        encoding='utf-8',
-        # level=logging.DEBUG if mode.lower() == 'testing' else logging.WARNING,
-        level=logging.WARNING,
-        format=('%(asctime)s:%(levelname)s:%(module)s:'
-                '%(funcName)s:line %(lineno)d:%(message)s'),
-        datefmt='%m/%d/%Y %I:%M:%S %p %Z')
+    testing = mode.lower() == 'testing'
+    handler = logging.FileHandler(filename, encoding='utf-8')
+    handler.setFormatter(logging.Formatter(
+        _DEBUG_FMT if testing else _PROD_FMT, datefmt=_DATE_FMT))
+    # records are dropped onto a queue and a single listener thread
+    # does the formatting and file write, so an exception storm from
+    # the monitor tasks costs the emitting thread a queue put instead
+    # of a blocking disk write.
+    q = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(q, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG if testing else logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(q))
 
 
 def get_filename(mode: str, now: object, filename: str) -> str:
-    """Sequentially check for parent directories and create them
-       as needed. Logs are sorted by mode/year/month/day/logfile.log"""
-    year = str(now.year)
-    month = str(now.month)
-    day = str(now.day)
-    return get_path(['logs', mode, year, month, day]) + filename + '.log'
-
-
-def get_path(directories: list[str]) -> str:
-    path = ''
-    for dir in directories:
-        path += f'{dir.lower()}/'
-        check_or_make(path)
+    """Logs are sorted by mode/year/month/day/logfile.log"""
+    path = _log_dir(mode.lower(), now.year, now.month, now.day)
+    return os.path.join(path, filename + '.log')
+
+
+@lru_cache(maxsize=None)
+def _log_dir(mode: str, year: int, month: int, day: int) -> str:
+    """create (once) and return the log directory for the given day.
+       a single makedirs replaces the old exists+mkdir walk -- one
+       syscall per level instead of two -- and the cache skips even
+       that for repeat configs on the same day."""
+    path = os.path.join('logs', mode, str(year), str(month), str(day))
+    os.makedirs(path, exist_ok=True)
     return path
 
 
-def check_or_make(path: str) -> None:
-    if not os.path.exists(path):
-        os.mkdir(path)
-
-
 if __name__ == '__main__':
     # DAT
     print(os.getcwd())
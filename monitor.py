@@ -1,9 +1,11 @@
 """module containing logic to monitor a position once it has been opened.
-   monitor() is the entry point, and is the target of a new
-   thread spooled from algo.py once a buy transaction is executed.
-   PnL is calculated repetitively until either a 50% return is achieved
-   or the holding_period is hit, at which point a call is made to sell()
-   and the trade is then logged to the db before the thread shuts down."""
+   monitor_async() is the entry point: algo.py posts one instance per
+   opened position onto the app's shared monitor loop, so all open
+   positions multiplex as coroutines on a single selector instead of
+   one thread + one event loop apiece. PnL is recalculated on ticker
+   updates until either a 50% return is achieved or the holding_period
+   is hit, at which point a call is made to sell() and the trade is
+   then logged to the db before the task finishes."""
 import asyncio
 import logging
 from datetime import timedelta
@@ -11,59 +13,106 @@ from datetime import timedelta
 import utils
 import transact
 import validate
-from db.db import DB
+from db import pool
+
+import numpy as np
 
 _logger = logging.getLogger(__name__)
 
 
-def monitor(app: object, underlying: object, db_time: object,
-            preexiting_positions: list) -> None:
-    asyncio.set_event_loop(asyncio.new_event_loop())
+async def monitor_async(app: object, underlying: object, db_time: object,
+                        preexiting_positions: list) -> None:
     symbol = underlying.symbol
     holding_period = underlying.holding_period
-    db = DB(path='./db/alpha.db', tz=app.tz)  # new instance for thread safety
     sell_time = db_time + timedelta(minutes=holding_period)
-    print('inside monitor')  # DAT
+    _logger.debug('monitoring %s until %s', symbol, sell_time)
     # db_time -= timedelta(days=500)  # DAT
-    # call IB server for list of open positions
-    ib_pos = validate.get_ib_positions(app, preexiting_positions)
-    db_pos = db.get_positions(symbol, db_time)
-    positions = validate.validate_positions(app.ib, symbol, ib_pos, db_pos)
-    if positions:
-        # is this if statement necessary?
-        run_thread_loop(
-            app.ib, app.account, db, app.tz, underlying, positions, sell_time)
-    # thread is automatically terminated at this stage.
+    # pooled instance: only this task touches it until checked back in
+    with pool.checkout(path='./db/alpha.db', tz=app.tz) as db:
+        # call IB server for list of open positions
+        ib_pos = validate.get_ib_positions(app, preexiting_positions)
+        db_pos = db.get_positions(symbol, db_time)
+        positions = validate.validate_positions(
+            app.ib, symbol, ib_pos, db_pos)
+        if positions:
+            # is this if statement necessary?
+            await run_monitor_loop(app.ib, app.account, db, app.tz,
+                                   underlying, positions, sell_time,
+                                   app._ib_loop)
+    # task finishes here; nothing retains it.
+
 
+async def run_monitor_loop(ib: object, account: object, db: object,
+                           tz: object, underlying: object,
+                           positions: list[object], sell_time: object,
+                           ib_loop: object) -> None:
+    """wait for either a > 50% realizable (selling to bid) return or
+       the end of the holding period, then trigger the sale."""
+    _logger.debug('watching %d positions', len(positions))
+    # quantities and opening cost never change while the position is
+    # held, so they (and the tick buffers) are built once up front and
+    # each pnl check reduces to two dots and a compare in C.
+    n = len(positions)
+    qty = np.fromiter(
+        (p.quantity for p in positions), dtype=np.int32, count=n)
+    y1 = float(np.fromiter(
+        (p.avg_price for p in positions), dtype=np.float64, count=n).dot(qty))
+    bids = np.empty(n)
+    sizes = np.empty(n)
+    # recompute pnl only when one of our tickers actually updates.
+    # updateEvent fires on ib's own thread, so the trigger crosses
+    # into this loop via call_soon_threadsafe.
+    loop = asyncio.get_running_loop()
+    done = asyncio.Event()
 
-def run_thread_loop(ib: object, account: object, db: object,
-                    tz: object, underlying: object,
-                    positions: list[object], sell_time: object) -> None:
-    """main thread loop to monitor the pnl of the positions
-       and trigger a sale after the holding period has elapsed
-       or predetermined level of realizable (selling to bid)
-       return is achieved."""
-    print('in monitor run_thread_loop')  # DAT
-    y1 = sum([p.avg_price * p.quantity for p in positions])
-    while utils.get_now(tz=tz) < sell_time:
+    def on_tick(ticker) -> None:
         try:
-            if calc_pnl(positions, y1) > 0.50:
-                # break loop to force a sale at > 50% return
-                break
-        except AssertionError:
-            pass  # `pass` instead of `continue` to catch the sleep below
+            pnl = calc_pnl(positions, y1, qty, bids, sizes)
+            if pnl is not None and pnl > 0.50:
+                # force a sale at > 50% return
+                loop.call_soon_threadsafe(done.set)
         except (AttributeError, TypeError) as e:
             _logger.exception(e)
-        ib.sleep(0.1)
-    transact.sell(ib, db, tz, underlying, account, positions)
-
 
-def calc_pnl(positions: list[object], y1: float) -> float:
-    """return the current liquidation return, as a % of opening cost"""
-    y2 = 0.0
     for position in positions:
-        bid = position.data_line.bid
-        bid_size = position.data_line.bidSize
-        assert bid_size >= position.quantity
-        y2 += bid * bid_size
-    return (y2 - y1) / y1
+        position.data_line.updateEvent += on_tick
+    try:
+        remaining = (sell_time - utils.get_now(tz=tz)).total_seconds()
+        if remaining > 0:
+            try:
+                await asyncio.wait_for(done.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                # holding period elapsed; sell at market state
+                pass
+    finally:
+        # tickers are shared across positions; don't leave handlers
+        # (and this frame) referenced after the task exits
+        for position in positions:
+            position.data_line.updateEvent -= on_tick
+    # the sell coroutines await statusEvent, whose wakeups fire on the
+    # thread driving the ib loop -- awaiting from a loop on another
+    # thread would complete futures cross-thread without a threadsafe
+    # handoff and could stall the liquidation. post the sale onto the
+    # ib loop and await its wrapped future from here, so other monitor
+    # tasks keep running meanwhile.
+    await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+        transact.sell_async(ib, db, tz, underlying, account, positions),
+        ib_loop))
+
+
+def calc_pnl(positions: list[object], y1: float, qty: np.ndarray,
+             bids: np.ndarray, sizes: np.ndarray) -> float:
+    """return the current liquidation return, as a % of opening cost,
+       or None when the book is too thin to absorb the position.
+       `bids` and `sizes` are preallocated scratch buffers owned by the
+       caller; only the ticker reads stay in Python. the thin-book
+       case is an ordinary return value rather than an AssertionError:
+       on an illiquid straddle it fires on most ticks, and raising /
+       unwinding an exception per tick was the loop's dominant cost."""
+    for i, position in enumerate(positions):
+        line = position.data_line
+        bids[i] = line.bid
+        sizes[i] = line.bidSize
+    if not np.all(sizes >= qty):
+        return None  # insufficient liquidity
+    return (bids.dot(sizes) - y1) / y1
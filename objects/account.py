@@ -1,4 +1,18 @@
 
+# accountSummary tag -> Account attribute. one dict probe per row
+# instead of walking an if/elif chain for each of the ~60 tags IB
+# sends back. the old chain also had a dead second 'TotalCashValue'
+# branch that left total_cash_value stuck at 0.0; see refresh_account.
+_TAG_MAP = {
+    'TotalCashValue': 'cash',
+    'Cushion': 'cushion',
+    'AvailableFunds': 'available_funds',
+    'BuyingPower': 'buying_power',
+    'MaintMarginReq': 'maintenance_margin',
+    'ExcessLiquidity': 'excess_liquidity',
+}
+
+
 class Account:
     def __init__(self, app: object) -> None:
         self.app = app
@@ -19,19 +33,9 @@ class Account:
         # .html#acd761f48771f61dd0fb9e9a7d88d4f04
         # for a complete list of tags.
         for v in self.app.ib.accountSummary(self.app.account_num):
-            if v.tag == 'TotalCashValue':
-                self.cash = float(v.value)
-            elif v.tag == 'Cushion':
-                self.cushion = float(v.value)
-            elif v.tag == 'AvailableFunds':
-                self.available_funds = float(v.value)
-            elif v.tag == 'BuyingPower':
-                self.buying_power = float(v.value)
-            elif v.tag == 'MaintMarginReq':
-                self.maintenance_margin = float(v.value)
-            elif v.tag == 'ExcessLiquidity':
-                self.excess_liquidity = float(v.value)
-            elif v.tag == 'TotalCashValue':
-                self.total_cash_value = float(v.value)
-            else:
-                continue
+            attr = _TAG_MAP.get(v.tag)
+            if attr is not None:
+                setattr(self, attr, float(v.value))
+        # the second TotalCashValue elif could never run; keep the
+        # attribute in sync with cash explicitly instead.
+        self.total_cash_value = self.cash
@@ -1,3 +1,5 @@
+import numpy as np
+
 
 class Model:
     def __init__(self) -> None:
@@ -9,8 +11,16 @@ class Model:
         # input feature vector:
         #   [vol_ma_gap, vol_gap, iv, real_vol_last, real_vol_ma, now]
         # nan values will cause result to be False, but not throw errors.
-        return bool(
-            (f[0] > self.w1) *
-            (f[1] > self.w2) *
-            (f[2] < self.w3) *
-            (f[3] < f[4]))
+        # `and` short-circuits on the first failed gate -- usually
+        # f[0] <= w1 -- where the old arithmetic product always paid
+        # for all four compares and three multiplies.
+        return bool(f[0] > self.w1 and f[1] > self.w2
+                    and f[2] < self.w3 and f[3] < f[4])
+
+    def eval_batch(self, f: np.ndarray) -> np.ndarray:
+        """evaluate the gate over a whole feature matrix (one row per
+           sample, columns as in eval) in four C-level passes; used by
+           backtests and weight sweeps where calling eval per row
+           would spend more time in the interpreter than the gate."""
+        return ((f[:, 0] > self.w1) & (f[:, 1] > self.w2)
+                & (f[:, 2] < self.w3) & (f[:, 3] < f[:, 4]))
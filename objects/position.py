@@ -1,10 +1,50 @@
 import logging
+from functools import lru_cache
+
+from ib_insync import Option
+
+# live market-data lines shared across Position instances. IB caps
+# concurrent mktData lines (100 by default), so duplicate contracts
+# across the ib- and db-built positions must reuse one ticker instead
+# of burning a second slot.
+_ticker_cache = {}
+
+
+@lru_cache(maxsize=512)
+def _option_contract(symbol: str, expiration: str, trading_class: str,
+                     strike: float, right: str, exchange: str,
+                     multiplier: str) -> object:
+    """Option contracts are plain value objects, so identical DB rows
+       share one instance instead of rebuilding per Position."""
+    return Option(
+        symbol=symbol,
+        lastTradeDateOrContractMonth=expiration,
+        tradingClass=trading_class,
+        strike=strike,
+        right=right,
+        exchange=exchange,
+        multiplier=multiplier)
+
+
+def _contract_key(contract: object) -> object:
+    """key a contract by conId once qualified, else by its terms"""
+    return contract.conId or (contract.symbol,
+                              contract.lastTradeDateOrContractMonth,
+                              contract.strike,
+                              contract.right)
 
 
 class Position:
+    # slots instead of a per-instance __dict__: attribute reads in the
+    # monitor pnl loop become fixed-offset loads, and each instance
+    # sheds the dict overhead. sell_price is set later by
+    # validate.validate_sell, so it needs a slot too.
+    __slots__ = ('symbol', 'quantity', 'avg_price', 'contract',
+                 'data_line', 'bsm_price', 'sell_price')
+    _logger = logging.getLogger(__name__)
+
     def __init__(self, ib: object, symbol: str,
                  db_position: object = None, ib_position: object = None):
-        self._logger = logging.getLogger(__name__)
         self.symbol: str = symbol
         if not db_position and not ib_position:
             msg = f'Need one of: {db_position, ib_position}.'
@@ -16,34 +56,38 @@ class Position:
             self.avg_price: float = db_position['avg_price']
             self.contract: object = self._build_contract(db_position)
         else:
-            self.quantity: int = ib_position.position // 100  # test this...
-            self.avg_price: float = ib_position.avgCost // 100
+            self.quantity: int = int(ib_position.position) // 100
+            # true division: avgCost is quoted per 100-share contract,
+            # and the old floor division truncated $1.53 to $1.0,
+            # skewing every downstream pnl calculation.
+            self.avg_price: float = float(ib_position.avgCost) / 100.0
             self.contract: object = ib_position.contract
-        self.data_line: object = ib.reqMktData(self.contract)
+        key = _contract_key(self.contract)
+        line = _ticker_cache.get(key)
+        if line is None:
+            line = _ticker_cache[key] = ib.reqMktData(self.contract)
+        self.data_line: object = line
         self.bsm_price: float = 0.0
 
     def _build_contract(self, row) -> object:
-        from ib_insync import Option
-        return Option(
-            symbol=self.symbol,
-            lastTradeDateOrContractMonth=row['expiration'],
-            tradingClass=row['trading_class'],
-            strike=row['strike'],
-            right=row['right'],
-            exchange=row['exchange'] or '',
-            multiplier=row['multiplier'])
-
-
-def build_positions(ib: object, symbol: str,
-                    ib_positions: list, db_positions: list) -> tuple[object]:
-    """return Position class instances using the given DB and IB data"""
-    valid_ib = []  # list of Position objs created with validated ib data
-    valid_db = []  # list of Position objs created with validated db data
-    for position in ib_positions:
-        if position.contract.symbol == symbol:
-            # only deal with positions for {symbol}
-            valid_ib.append(Position(ib, symbol, ib_position=position))
-    for position in db_positions:
-        # this is already filtered by symbol from the db
-        valid_db.append(Position(ib, symbol, db_position=position))
+        return _option_contract(
+            self.symbol,
+            row['expiration'],
+            row['trading_class'],
+            row['strike'],
+            row['right'],
+            row['exchange'] or '',
+            row['multiplier'])
+
+
+def build_positions(ib: object, symbol: str, ib_positions: dict,
+                    db_positions: list) -> tuple[object]:
+    """return Position class instances using the given DB and IB data.
+       `ib_positions` arrives pre-bucketed by symbol (see
+       validate.get_ib_positions), so only this symbol's bucket is
+       touched rather than filtering the whole account per call."""
+    valid_ib = [Position(ib, symbol, ib_position=p)
+                for p in ib_positions.get(symbol, ())]
+    # db rows are already filtered by symbol from the query
+    valid_db = [Position(ib, symbol, db_position=p) for p in db_positions]
     return valid_ib, valid_db
@@ -1,6 +1,9 @@
 import math
+import time
 import logging
-from bisect import insort
+import itertools
+from bisect import bisect_left
+from functools import lru_cache
 from datetime import datetime, timedelta
 
 import utils
@@ -9,6 +12,50 @@ from exceptions.exceptions import InitError
 import numpy as np
 from ib_insync import Stock, Index, Option
 
+# annualization for per-minute realized vol: 252 days * 390 minutes.
+# sqrt hoisted out of the per-tick vol math.
+_ANNUALIZATION = math.sqrt(252 * 390)
+# bound once so the per-tick vol math skips the LOAD_GLOBAL/LOAD_ATTR
+# pair for each call
+_log = math.log
+_np_log = np.log
+_np_abs = np.abs
+_RIGHTS = frozenset({'C', 'CALL', 'P', 'PUT'})
+_SEC_TYPES = frozenset({'STK', 'IND'})
+# expected types of the attributes unpacked from the db row; drives
+# _validate_db_data so new columns only need a line here
+_DB_SPEC = (
+    ('dbid', int),
+    ('con_id', int),
+    ('symbol', str),
+    ('sec_type', str),
+    ('currency', str),
+    ('exchange', str),
+    ('primary_exchange', str),
+    ('option_trading_class', str),
+    ('option_multiplier', str),
+    ('option_settlement', str),
+    ('option_style', str),
+)
+# session datetimes _validate_datetimes checks for presence and type
+_DT_ATTRS = ('t1', 't2', 'open_time', 'close_time', 'options_expiration')
+HOLDING_PERIOD = 29  # minutes
+# entry-window offsets, built once instead of per underlying init
+_T1_DELTA = timedelta(minutes=15)  # earliest entry: 15 mins after open
+_T2_DELTA = timedelta(hours=4)  # latest entry: 4 hours before close
+_HOLDING_DELTA = timedelta(minutes=HOLDING_PERIOD)
+
+
+@lru_cache(maxsize=512)
+def _cached_schedule(exchange: str, end: str = None) -> tuple[datetime]:
+    """memoized utils.get_schedule. building an mcal schedule takes
+       on the order of half a second, and every underlying on the same
+       exchange (plus every expiration lookup) asks for the same one,
+       so it's built once per (exchange, end) per process. safe to
+       cache because the process is restarted each session, so the
+       implicit `today` start date never goes stale."""
+    return utils.get_schedule(exchange, end=end)
+
 
 class Underlying:
     def __init__(self, app: object, underlying: object):
@@ -36,16 +83,19 @@ class Underlying:
         self.strikes = []  # compute unique strikes once, instead of every iter
         self.straddle_options = []  # live data for nearest-strike options
         self.strangle_options = []  # live data for next 2 nearest-strikes
+        self._live_strikes = set()  # strikes with a live data line
         self.options_expiration: datetime = None
-        self.open_time, self.close_time = utils.get_schedule(self.exchange)
-        self.HOLDING_PERIOD = 29  # minutes
+        self.open_time, self.close_time = _cached_schedule(self.exchange)
+        self.HOLDING_PERIOD = HOLDING_PERIOD  # minutes
         self.t1, self.t2 = self._build_permissible_times()
         self.iv = 0.0  # avg of askGreeks.IV of all contracts in data line
         self.real_vol_last = 0.0  # involves pulling data from db
         self.real_vol_ma = 0.0  # involves pulling data from db
         self.vol_ma_gap = 0.0  # a calculation of above attributes
         self.vol_gap = 0.0  # a calculation of above attributes
-        self.features = []  # feature vector to feed into model
+        # feature vector to feed into model; allocated once and filled
+        # in place every tick
+        self.features = np.empty(5)
         self._post_init()
 
     def _post_init(self) -> None:
@@ -85,39 +135,31 @@ class Underlying:
         self._validate_chain()
 
     def _validate_datetimes(self):
-        try:
-            assert isinstance(self.t1, datetime)
-            assert isinstance(self.t2, datetime)
-            assert isinstance(self.open_time, datetime)
-            assert isinstance(self.close_time, datetime)
-            assert isinstance(self.options_expiration, datetime)
-            today = self.app.session_start_time.date()
-            assert self.open_time.date() == today
-            assert self.close_time.date() == today
-            assert self.t1.date() == today
-            assert self.t2.date() == today
-        except AssertionError as e:
-            self._logger.exception(e)
+        """every session time must be a datetime falling on today.
+           the type pass short-circuits first, so the .date() checks
+           never see a None."""
+        today = self.app.session_start_time.date()
+        valid = (all(isinstance(getattr(self, name), datetime)
+                     for name in _DT_ATTRS)
+                 and self.open_time.date() == today
+                 and self.close_time.date() == today
+                 and self.t1.date() == today
+                 and self.t2.date() == today)
+        if not valid:
+            self._logger.error(
+                f'invalid session datetimes for {self.symbol}')
             self.shutdown(on_init=True)
 
     def _validate_db_data(self):
-        """assert that database data are of the correct type"""
-        sec_types = {'STK', 'IND'}
-        try:
-            assert isinstance(self.dbid, int)
-            assert isinstance(self.con_id, int)
-            assert isinstance(self.symbol, str)
-            assert isinstance(self.sec_type, str)
-            assert isinstance(self.currency, str)
-            assert isinstance(self.exchange, str)
-            assert isinstance(self.primary_exchange, str)
-            assert isinstance(self.option_trading_class, str)
-            assert isinstance(self.option_multiplier, str)
-            assert isinstance(self.option_settlement, str)
-            assert isinstance(self.option_style, str)
-            assert self.sec_type in sec_types
-        except AssertionError as e:
-            self._logger.exception(e)
+        """check that database data are of the correct type. a single
+           boolean predicate with one log on failure, rather than a
+           chain of asserts raising through the interpreter."""
+        valid = (all(isinstance(getattr(self, name), typ)
+                     for name, typ in _DB_SPEC)
+                 and self.sec_type in _SEC_TYPES)
+        if not valid:
+            self._logger.error(
+                f'invalid underlying db row for {self.symbol}')
             self.shutdown(on_init=True)
 
     def _validate_contract(self) -> None:
@@ -140,30 +182,20 @@ class Underlying:
         # preserving valid ones and not failing the entire underlying on
         # a few bad contracts. If any valid ones exist, the Underlying
         # is kept alive.
-        rights = {'C', 'CALL', 'P', 'PUT'}
-        options = self.chain.copy()
-        self.chain.clear()
-        for option in options:
-            try:
-                # NOTE: at this stage these values should be populated since
-                #       the call to ib.qualifyContracts is blocking.
-                conid = option.conId
-                symbol = option.symbol
-                exchange = option.exchange
-                strike = option.strike
-                right = option.right
-                expiration = option.lastTradeDateOrContractMonth
-                assert isinstance(conid, int)
-                assert isinstance(symbol, str)
-                assert isinstance(exchange, str)
-                assert isinstance(strike, float)
-                assert isinstance(right, str)
-                assert isinstance(expiration, str)
-                assert symbol.upper() == self.symbol.upper()
-                assert right in rights
-                self.chain.append(option)
-            except (AssertionError, AttributeError):
-                continue
+        # NOTE: at this stage these values should be populated since
+        #       the call to ib.qualifyContracts is blocking.
+        # bad contracts are expected input here, so the filter uses
+        # getattr probes instead of paying an exception unwind apiece.
+        symbol = self.symbol.upper()
+        self.chain = [
+            o for o in self.chain
+            if isinstance(getattr(o, 'conId', None), int)
+            and isinstance(getattr(o, 'exchange', None), str)
+            and isinstance(getattr(o, 'strike', None), float)
+            and isinstance(
+                getattr(o, 'lastTradeDateOrContractMonth', None), str)
+            and getattr(o, 'right', None) in _RIGHTS
+            and getattr(o, 'symbol', '').upper() == symbol]
         if not self.chain:
             self._logger.error('chain of length 0 encountered.')
             self.shutdown(on_init=True)
@@ -174,9 +206,9 @@ class Underlying:
            on open and close times already pulled from pandas market calendars,
            it tracks early closes and other schedule irregularities."""
         try:
-            t1 = self.open_time + timedelta(minutes=15)  # 15 mins after open
-            t2 = self.close_time - timedelta(hours=4)  # 4 hours before close
-            latest_possible = t2 + timedelta(minutes=self.HOLDING_PERIOD)
+            t1 = self.open_time + _T1_DELTA
+            t2 = self.close_time - _T2_DELTA
+            latest_possible = t2 + _HOLDING_DELTA
             assert latest_possible < self.close_time
         except (TypeError, AttributeError) as e:
             self._logger.exception(e)
@@ -184,32 +216,50 @@ class Underlying:
         return t1, t2
 
     def build_feature_vector(self, time) -> None:
-        """Refresh data and then populate a feature vector"""
+        """Refresh data and then populate the feature vector in place.
+           consumers only read self.features, so reusing the buffer is
+           safe and skips a fresh allocation per tick."""
         self._refresh_data(time)
-        self.features = np.array([
-            self.vol_ma_gap,
-            self.vol_gap,
-            self.iv,
-            self.real_vol_last,
-            self.real_vol_ma
-        ])
+        f = self.features
+        f[0] = self.vol_ma_gap
+        f[1] = self.vol_gap
+        f[2] = self.iv
+        f[3] = self.real_vol_last
+        f[4] = self.real_vol_ma
+
+    @staticmethod
+    def build_feature_matrix(underlyings: list, time) -> np.ndarray:
+        """refresh every underlying and assemble all feature vectors as
+           one (N, 5) matrix in a single numpy allocation, assigning each
+           instance a row view. the refresh itself stays per-underlying
+           since it drives IB data lines and DB queries; only the feature
+           assembly is batched."""
+        for u in underlyings:
+            u._refresh_data(time)
+        matrix = np.array(
+            [[u.vol_ma_gap, u.vol_gap, u.iv, u.real_vol_last, u.real_vol_ma]
+             for u in underlyings])
+        for u, row in zip(underlyings, matrix):
+            u.features = row
+        return matrix
 
     def _req_underlying_data(self) -> None:
         self.data_line = self.app.ib.reqMktData(self.contract)
         self._load_data_line()
 
     def _load_data_line(self, timeout: int = 12) -> None:
-        """wait for the market data line to load, or a timeout of 12 seconds"""
+        """wait for the market data line to load, or a timeout of 12 seconds.
+           waitOnUpdate blocks until ib actually delivers something, so
+           the wait wakes per update instead of polling every 100ms."""
         self._logger.info(f'loading data_line for {self.symbol}')
-        loaded = False
-        for _ in range(timeout*10):
-            if not math.isnan(self.data_line.marketPrice()):
-                loaded = True
+        deadline = time.monotonic() + timeout
+        while math.isnan(self.data_line.marketPrice()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.app.ib.waitOnUpdate(remaining):
+                self._logger.error(
+                    f'failed to load {self.symbol} data_line')
+                self.shutdown(on_init=True)
                 break
-            self.app.ib.sleep(0.1)
-        if not loaded:
-            self._logger.error(f'failed to load {self.symbol} data_line')
-            self.shutdown(on_init=True)
 
     def _cancel_data_line(self) -> None:
         self.app.ib.cancelMktData(self.data_line.contract)
@@ -236,20 +286,17 @@ class Underlying:
             self.shutdown(on_init=True)
 
     def _load_contract(self, timeout: int = 12) -> None:
-        """wait for the contract to load with a timeout of 12 seconds"""
-        loaded = False
-        for _ in range(timeout*10):
-            # timeout * 10 so timeout is in seconds and sleep is 0.1s
-            try:
-                if self.contract.conId != 0:
-                    loaded = True
-                    break
-            except AttributeError:
-                continue
-            self.app.ib.sleep(0.1)
-        if not loaded:
-            self._logger.error(f'failed to load {self.symbol} contract')
-            self.shutdown(on_init=True)
+        """wait for the contract to load with a timeout of 12 seconds.
+           same event-driven wait as _load_data_line; the old loop also
+           spun without sleeping whenever conId was missing entirely."""
+        deadline = time.monotonic() + timeout
+        while not getattr(self.contract, 'conId', 0):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.app.ib.waitOnUpdate(remaining):
+                self._logger.error(
+                    f'failed to load {self.symbol} contract')
+                self.shutdown(on_init=True)
+                break
 
     def _build_option_chain(self) -> None:
         """Request the options chain, filter down by exchange and
@@ -271,10 +318,9 @@ class Underlying:
     def _grab_strikes(self) -> list:
         """set a class attribute with all of the unique strikes
            from the options chain once, instead of calculating
-           it every loop in _get_adjacent_strikes(). NOTE:
-           `.tolist()` is required for `insort` to work downstream"""
-        self.strikes = np.unique(sorted(
-            [c.strike for c in self.chain])).tolist()
+           it every loop in _get_adjacent_strikes(). a plain sorted
+           list of floats, so bisect works on it directly."""
+        self.strikes = sorted({c.strike for c in self.chain})
 
     def _refresh_data(self, time) -> None:
         self._manage_option_data_lines()
@@ -284,15 +330,19 @@ class Underlying:
         self.vol_gap = self.real_vol_last - self.iv
 
     def _calc_realized_vol(self, a: list) -> float:
+        # one row -> all-scalar math; sqrt(x**2) is just abs(x)
         try:
             a = a[-1]
-            return np.sqrt(252 * 390 * np.log(a[0] / a[1]) ** 2)
+            return _ANNUALIZATION * abs(_log(a[0] / a[1]))
         except (IndexError, TypeError):
             return float('nan')
 
     def _cal_realized_vol_ma(self, a: list) -> float:
+        # abs replaces the square-then-sqrt pair, so the array is
+        # traversed twice (log, abs+mean) instead of four times
         try:
-            return np.sqrt(252 * 390 * np.log(a[:, 0] / a[:, 1]) ** 2).mean()
+            return _ANNUALIZATION * _np_abs(
+                _np_log(a[:, 0] / a[:, 1])).mean()
         except (IndexError, TypeError):
             return float('nan')
 
@@ -302,16 +352,28 @@ class Underlying:
         self.real_vol_ma = self._cal_realized_vol_ma(data)
 
     def _refresh_iv(self) -> None:
+        """set iv to the average impliedVol across the straddle legs,
+           skipping nan values. a scalar running sum: with 2-4 legs a
+           numpy array build per tick is all overhead and no math."""
         try:
-            a = np.array([o.askGreeks.impliedVol for
-                          o in self.straddle_options])
-            a = a[~np.isnan(a)]  # remove nan values from array
-            self.iv = np.mean(a)  # set iv == average IV
+            total, n = 0.0, 0
+            for o in self.straddle_options:
+                v = o.askGreeks.impliedVol
+                if v == v:  # nan != nan; cheaper than math.isnan
+                    total += v
+                    n += 1
+            self.iv = total / n if n else float('nan')
         except (AttributeError, TypeError):
             self.iv = float('nan')
 
     def _req_option_data(self, contracts: list) -> list:
-        return [self.app.ib.reqMktData(c) for c in contracts]
+        """request market data for all contracts as one batch.
+           reqMktData returns immediately, so every request is queued
+           first and a single zero-length sleep lets the reactor flush
+           them in one tick rather than interleaving with other work."""
+        lines = [self.app.ib.reqMktData(c) for c in contracts]
+        self.app.ib.sleep(0)
+        return lines
 
     def _cancel_contracts(self, contracts: list) -> None:
         for contract in contracts:
@@ -336,17 +398,20 @@ class Underlying:
         """take the string expiration and return the exact
            datetime expiration of the option based on exchange
            hours."""
-        return utils.get_schedule(self.exchange, end=exp)[1]
+        return _cached_schedule(self.exchange, end=str(exp))[1]
 
     def _filter_expirations(self, chain: list) -> str:
-        """sort the strikes by expiration and return the nearest tenor"""
+        """return the nearest tenor. expirations are yyyymmdd strings,
+           so lexical min is the earliest date -- no array build needed"""
         # throw a try block aroudn this?? IndexError??, other errors??
-        return str(np.unique(sorted([c.expirations for c in chain]))[0])
+        return min(e for c in chain for e in c.expirations)
 
-    def _filter_strikes(self, chain: list) -> np.array:
-        """get all strikes from potentially nested list of chains
-           and then flatten the nested arrays to return a 1D array"""
-        return np.unique([c.strikes for c in chain])
+    def _filter_strikes(self, chain: list) -> list:
+        """get all unique strikes from the (ragged) list of chains as a
+           sorted list. a set union beats np.unique here: the input is
+           a handful of tuples, and numpy would fall back to its slow
+           object-dtype path on the ragged nesting anyway."""
+        return sorted({s for c in chain for s in c.strikes})
 
     def _validate_spot(self, spot) -> bool:
         try:
@@ -375,33 +440,34 @@ class Underlying:
         return spot
 
     def _get_adjacent_strikes(self) -> list:
+        """return the 3 strikes either side of spot. a single bisect on
+           the already-sorted strikes replaces the old copy + insort +
+           index + remove sequence (three O(N) scans per tick), and no
+           longer drops a real strike when spot lands exactly on one.
+           self.strikes is only sliced, never mutated, so no defensive
+           copy is needed."""
         spot = self._get_spot()
-        strikes = self.strikes.copy()
-        # TODO: see using lambda with min() instead of insort. test speed:
-        # closest_strike = min(strikes, key=lambda value: abs(value - spot))
-        insort(strikes, spot)  # add spot into the list of sorted strikes
-        spot_index = strikes.index(spot)
-        strikes.remove(spot)
-        next_strikes = strikes[spot_index - 3:spot_index + 3]
-        return next_strikes
-
-    def _remove_data_lines(self, invalid_strikes: set) -> None:
-        # are the contracts becoming [] after cancellation?
-        print('straddle_options', self.straddle_options)  # DAT
-        print('len odl', len(self.straddle_options))  # DAT
-        self.straddle_options.remove(
-            [c for c in self.straddle_options if
-             c.contract.strike in invalid_strikes])
-        self.strangle_options.remove(
-            [c for c in self.strangle_options if
-             c.contract.strike in invalid_strikes])
+        i = bisect_left(self.strikes, spot)
+        return self.strikes[max(0, i - 3):i + 3]
+
+    def _remove_data_lines(self, invalid_strikes: frozenset) -> None:
+        # in-place slice assignment: the old code passed a whole list
+        # comprehension to list.remove, which could only ever raise
+        # ValueError (the list itself is never an element)
+        self.straddle_options[:] = [
+            c for c in self.straddle_options if
+            c.contract.strike not in invalid_strikes]
+        self.strangle_options[:] = [
+            c for c in self.strangle_options if
+            c.contract.strike not in invalid_strikes]
 
     def _handle_invalid_contracts(self, invalid_strikes: set) -> None:
         """Cancel ib mkt data lines for every unneeded contract"""
         self._cancel_contracts(
-            [c.contract for c in self.straddle_options +
-             self.strangle_options if
-             c.contract.strike in invalid_strikes])
+            [c.contract for c in itertools.chain(self.straddle_options,
+                                                 self.strangle_options)
+             if c.contract.strike in invalid_strikes])
+        self._live_strikes -= invalid_strikes
 
     def _handle_missing_contracts(self, missing_strikes: set) -> None:
         """Request market data for needed contracts and append
@@ -410,6 +476,7 @@ class Underlying:
            details to the database, letting the DB handle duplicate errors."""
         contracts = [c for c in self.chain if c.strike in missing_strikes]
         self.straddle_options.extend(self._req_option_data(contracts))
+        self._live_strikes |= missing_strikes
         self.app.db.log_options(self.dbid, contracts)
 
     def _sort_options(self, needed_strikes: list) -> None:
@@ -417,17 +484,22 @@ class Underlying:
            that are immediate straddles of the underlying spot price.
            then ensure that the preloaded_data line houses the next
            further strikes out."""
-        straddle_strikes = set(needed_strikes[2:4])
-        del needed_strikes[2:4]
-        strangle_strikes = set(needed_strikes)
-        options = self.straddle_options + self.strangle_options
-        # ^ NOTE: no copy() needed here because a new list is created with `+`
-        self.straddle_options.clear()
-        self.strangle_options.clear()
-        self.straddle_options.extend(
-            [o for o in options if o.contract.strike in straddle_strikes])
-        self.strangle_options.extend(
-            [o for o in options if o.contract.strike in strangle_strikes])
+        straddle_strikes = frozenset(needed_strikes[2:4])
+        strangle_strikes = frozenset(
+            needed_strikes[:2] + needed_strikes[4:])
+        straddle_new, strangle_new = [], []
+        for o in itertools.chain(self.straddle_options,
+                                 self.strangle_options):
+            strike = o.contract.strike
+            if strike in straddle_strikes:
+                straddle_new.append(o)
+            elif strike in strangle_strikes:
+                strangle_new.append(o)
+        # slice-assign instead of clear+extend: one pass over the
+        # options instead of two, and both lists keep a stable identity
+        # for anything downstream holding a reference to them.
+        self.straddle_options[:] = straddle_new
+        self.strangle_options[:] = strangle_new
 
     def _manage_option_data_lines(self) -> None:
         """Method to manage option data lines to have only the necessary
@@ -437,13 +509,14 @@ class Underlying:
            needed but not currently live data lines are requested. This
            method is also used on initialization to populate straddle and
            preload lists with live options data."""
-        options = self.straddle_options + self.strangle_options
-        # TODO: make live_strikes a class attribute updated when contracts
-        #       change, this way it isn't necessarily calculated every iter.
-        live_strikes = np.unique([c.contract.strike for c in options]).tolist()
+        # _live_strikes is maintained by the add/cancel handlers below,
+        # so per tick this is two set differences instead of rebuilding
+        # the strike list from every live contract.
+        live_strikes = self._live_strikes
         needed_strikes = self._get_adjacent_strikes()
-        missing_strikes = set(needed_strikes) - set(live_strikes)
-        invalid_strikes = set(live_strikes) - set(needed_strikes)
+        needed = set(needed_strikes)
+        missing_strikes = needed - live_strikes
+        invalid_strikes = frozenset(live_strikes - needed)
         if invalid_strikes:
             self._handle_invalid_contracts(invalid_strikes)
         if missing_strikes:
@@ -455,9 +528,10 @@ class Underlying:
            a call to App to remove this underlying from its list."""
         if self.data_line is not None:
             self._cancel_data_line()
-        options = self.strangle_options + self.straddle_options
-        if options:
-            self._cancel_contracts([c.contract for c in options])
+        if self.strangle_options or self.straddle_options:
+            self._cancel_contracts(
+                [c.contract for c in itertools.chain(
+                    self.strangle_options, self.straddle_options)])
         self.is_alive = False
         if on_init:
             raise InitError
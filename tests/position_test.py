@@ -0,0 +1,31 @@
+"""pytest cases for Position construction from ib-insync records,
+   pinning the avgCost scaling: $153 per contract must come out as
+   $1.53 average price, not floor-divided down to $1.0."""
+from types import SimpleNamespace
+
+from objects.position import Position
+
+
+class FakeIB:
+    def reqMktData(self, contract):
+        return SimpleNamespace(contract=contract)
+
+
+def _ib_position(position: float, avg_cost: float) -> SimpleNamespace:
+    contract = SimpleNamespace(
+        conId=514502747, symbol='SPX', lastTradeDateOrContractMonth='20211126',
+        strike=4700.0, right='C')
+    return SimpleNamespace(
+        position=position, avgCost=avg_cost, contract=contract)
+
+
+def test_avg_price_true_division():
+    p = Position(FakeIB(), 'SPX', ib_position=_ib_position(100, 153.0))
+    assert p.quantity == 1
+    assert p.avg_price == 1.53
+
+
+def test_multi_contract_quantity():
+    p = Position(FakeIB(), 'SPX', ib_position=_ib_position(300, 250.0))
+    assert p.quantity == 3
+    assert p.avg_price == 2.50
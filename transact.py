@@ -1,5 +1,9 @@
 """module for buy and sell logic. perform pre-validation and execution"""
 
+import asyncio
+from operator import itemgetter
+from itertools import chain
+
 from exceptions.exceptions import ValidationError, OrderError
 
 import validate
@@ -7,34 +11,46 @@ import bsm
 
 from ib_insync import LimitOrder, Option
 
+_TERMINAL_STATES = frozenset({'Cancelled', 'ApiCancelled', 'Filled'})
+_VALID_ACTIONS = frozenset({'BUY', 'SELL'})
+_VALID_TIF = frozenset({'IOC', 'FOK', 'DTC', 'DAY'})
+
 
 def buy(app: object, underlying: object, time,
         exiting_positions: list[object]) -> bool:
-    """Main entry point into the sequence of opening a long straddle"""
-    options = validate.validate_buy(app, underlying, time)
-    quantity = get_quantity(options, app.account)
+    """Main entry point into the sequence of opening a long straddle.
+       both leg orders are built up front and executed concurrently on
+       the ib event loop, so the straddle pays one round-trip of fill
+       latency instead of two sequential ones. any fill disparity
+       between the legs is settled by audit() as before."""
+    options = validate.validate_buy(app, underlying, time)  # by right
+    quantity = get_quantity(options.values(), app.account)
     call_quantity, put_quantity = 0, 0
-    # TODO: make sure puts execute before calls. Currently call fill first.
-    #       do this in validate_buy.
-    for option in options:
-        if not quantity:
-            break
-        order = build_order('BUY', quantity, option, tif='DAY')
-        filled = execute(app, option.contract, order)
-        if option.contract.right in {'C', 'CALL'}:
-            call_quantity += filled
-        else:
-            put_quantity += filled
-        quantity = filled  # set the next options quantity to what was filled
+    if quantity:
+        orders = {right: build_order('BUY', quantity, option, tif='DAY')
+                  for right, option in options.items()}
+        fills = app.ib.run(asyncio.gather(
+            *(execute_async(app.ib, app.db, app.account_num,
+                            options[right].contract, orders[right],
+                            pending=app.pending_orders)
+              for right in options)))
+        fills = dict(zip(options, fills))
+        call_quantity = fills.get('C', 0)
+        put_quantity = fills.get('P', 0)
     audit(app, exiting_positions, underlying,
           time, options, call_quantity, put_quantity)
 
 
-def get_quantity(options: list[object], account: object) -> int:
+def get_quantity(options: object, account: object) -> int:
     """get the order quantity depending on ask_size and funds available."""
     max_deployable = account.available_funds * 0.25
-    min_ask_size = min([o.askSize for o in options])
-    position_price = sum([o.ask for o in options])
+    # both reductions in one pass, no throwaway lists
+    min_ask_size = float('inf')
+    position_price = 0.0
+    for o in options:
+        if o.askSize < min_ask_size:
+            min_ask_size = o.askSize
+        position_price += o.ask
     if min_ask_size * position_price >= max_deployable:
         quantity = max_deployable / position_price
     else:
@@ -46,9 +62,9 @@ def build_order(action: str, quantity: int, option: object,
                 tif: str = 'IOC') -> list:
     """build ib-insync LimitOrder objects populated with inputted
        values, defaulting to time-in-force of immediate-or-cancel"""
-    if action.upper() not in {'BUY', 'SELL'}:
+    if action.upper() not in _VALID_ACTIONS:
         raise ValidationError('Invalid action. Must be `BUY` or `SELL`')
-    if tif.upper() not in {'IOC', 'FOK', 'DTC', 'DAY'}:
+    if tif.upper() not in _VALID_TIF:
         raise ValidationError(
             'Invalid time-in-force. Must be in {`IOC`, `DTC`, `FOK`, `DAY`}')
     if action == 'BUY':
@@ -66,145 +82,222 @@ def build_order(action: str, quantity: int, option: object,
 
 
 def execute(app: object, contract: object, order: object) -> int:
+    """sync wrapper over execute_async for the sequential callers
+       (balance_position and the abort path)."""
+    return app.ib.run(execute_async(
+        app.ib, app.db, app.account_num, contract, order))
+
+
+async def execute_async(ib: object, db: object, account_num: str,
+                        contract: object, order: object,
+                        pending: dict = None) -> int:
     unfilled = order.totalQuantity
     failed_trades = 0
     total_filled = 0
     while unfilled and failed_trades < 12:
         order.totalQuantity = unfilled
-        trade = app.ib.placeOrder(contract, order)
+        trade = ib.placeOrder(contract, order)
+        if pending is not None:
+            # registered for the lifetime of the order so audit can
+            # see quantity that is placed but not yet terminal
+            pending[trade.order.orderId] = trade
         try:
-            unfilled = handle_order(app.ib, trade)
+            unfilled = await handle_order(ib, trade)
         except OrderError:
             failed_trades += 1
             continue
+        finally:
+            # evict anything no longer working at ib. isDone() does
+            # not cover 'Inactive' (the rejected/halted exits above),
+            # and a dead order left here would count toward its leg in
+            # audit and could mask a naked leg.
+            if pending is not None and (
+                    trade.isDone() or
+                    trade.orderStatus.status == 'Inactive'):
+                pending.pop(trade.order.orderId, None)
         if trade.filled():
             total_filled += trade.filled()
-            app.db.log_trade(trade, app.account_num)
+            db.log_trade(trade, account_num)
         else:
             failed_trades += 1
     return total_filled
 
 
-def handle_order(ib: object, trade: object) -> int:
+async def handle_order(ib: object, trade: object) -> int:
+    """wait for the trade to reach a terminal state. awaiting
+       statusEvent wakes on the actual network update, so each status
+       transition is seen as it lands instead of up to a poll-sleep
+       later, and idle in-flight orders cost no wakeups at all."""
     # should db logs be done here?? probably...
-    terminal_states = {'Cancelled', 'ApiCancelled', 'Filled'}
-    while trade.orderStatus.status not in terminal_states:
+    while trade.orderStatus.status not in _TERMINAL_STATES:
         if trade.orderStatus.status == 'Inactive':
             if trade.filled() > 0:
                 break
             else:
                 raise OrderError
-        ib.sleep(0.01)  # wait on trade to fill or be cancelled.
-        # NOTE: above sleep allows the ask to be
-        #       updates and therefore potentially invalid. Need to lock prices.
+        await trade.statusEvent  # fires on the next status change
+        # NOTE: the ask can still update while awaiting the fill and
+        #       therefore be potentially invalid. Need to lock prices.
     return trade.remaining()
 
 
 def audit(app: object, exiting_positions: list[object], underlying: object,
-          time, options: list[object], calls: int, puts: int) -> None:
+          time, options: dict, calls: int, puts: int) -> None:
     """Ensure that both straddle legs have the same position size,
-       else call balance_positions() to balance them out."""
+       else call balance_positions() to balance them out. quantity
+       still resting on an in-flight order counts toward its leg, so
+       a fill that is merely late is not bought a second time."""
+    for order_id, trade in list(app.pending_orders.items()):
+        if trade.isDone():
+            app.pending_orders.pop(order_id, None)
+        elif trade.contract.right[0] == 'C':
+            calls += trade.remaining()
+        else:
+            puts += trade.remaining()
     if calls != puts:
-        quantity = abs(calls - puts)  # disparity between calls and puts
+        disparity = abs(calls - puts)  # disparity between calls and puts
         right = 'PUT' if puts < calls else 'CALL'
-        quantity, _ = balance_position(app, options, 'BUY', right, quantity)
+        quantity, _ = balance_position(app, options, 'BUY', right, disparity)
         if quantity:
             # means that balance_position failed.
-            # abort the trade as a last resort.
-            abort_trade(app, exiting_positions, underlying, time)
+            # abort the trade as a last resort. the snapshot of legs
+            # and fills taken above only spares abort_trade its
+            # ib.positions() round-trip if balance_position got no
+            # fills at all; any fill (buy or sell) shrinks the
+            # remaining quantity, so an unchanged quantity proves the
+            # snapshot is still accurate.
+            if quantity == disparity:
+                legs = {'C': (options['C'].contract, calls),
+                        'P': (options['P'].contract, puts)}
+            else:
+                legs = None
+            abort_trade(app, exiting_positions, underlying, time, legs)
 
 
-def balance_position(app: object, options: list[object],
+def balance_position(app: object, options: dict,
                      action: str, right: str, quantity: int,
                      depth: int = 0, alive: bool = True) -> tuple[int, bool]:
-    """Use recursion to balance out positions by alternating
-       between buying the lesser quantity option and selling
-       the greater quantity option. Execution ends when either
-       max recursion depth is reached, or quantities are balanced."""
-    rights = {'C', 'CALL'} if right == 'CALL' else {'P', 'PUT'}
-    depth += 1
-    if depth > 4:
-        # limit max recursion depth to 4
-        alive = False
-    if alive and quantity:
-        try:
-            option = [o for o in options if o.contract.right in rights][0]
-        except (IndexError, TypeError) as e:
-            app._logger.exception(e)
+    """Balance out positions by alternating between buying the lesser
+       quantity option and selling the greater quantity option, giving
+       up after 4 attempts. The retries are a linear continuation, not
+       a tree, so this runs as a loop with in-place state flips rather
+       than recursion -- which also fixes the old recursive calls
+       dropping the `action` argument (`right` slid into its place)
+       and full fills being reported back as unbalanced."""
+    while depth < 4 and alive and quantity:
+        depth += 1
+        # options arrives keyed by right from validate.optimize_pair
+        option = options.get('C' if right == 'CALL' else 'P')
+        if option is None:
+            app._logger.error('no %s option available to balance', right)
             alive = False
-            return quantity, alive
+            break
         order = build_order(action, quantity, option, tif='IOC')
         filled = execute(app, option.contract, order)
         if filled:
-            if filled < quantity:
-                quantity -= filled
-                quantity, alive = balance_position(
-                    app, options, right, quantity, depth, alive)
+            quantity -= filled
         else:
             # no fills occured, instead of trying to buying
             # the lesser right again, sell the greater right.
             right = 'PUT' if right == 'CALL' else 'CALL'  # opposite right
             action = 'SELL' if action == 'BUY' else 'BUY'  # opposite action
-            quantity, alive = balance_position(
-                app, options, action, right, quantity, depth, alive)
     return quantity, alive
 
 
 def abort_trade(app: object, existing_positions: list[object],
-                underlying, time) -> None:
-    """positions have been unsuccessful in filling, abort the trade and close
-       all associated position"""
-    positions = validate.get_ib_positions(app, existing_positions)
-    for position in positions:
-        quantity = position.position // 100  # is // 100 needed??
-        option = position.contract
-        price = calc_abort_price(app, position, underlying)
-        order = LimitOrder(
+                underlying, time, legs: dict = None) -> None:
+    """positions have been unsuccessful in filling, abort the trade and
+       close all associated position. when the caller already knows
+       which legs it opened (the audit path), those contracts and fill
+       counts are sold directly; the ib.positions() round-trip only
+       happens as a fallback when no snapshot is supplied."""
+    if legs is not None:
+        to_close = [(c, q) for c, q in legs.values() if q]
+    else:
+        positions = validate.get_ib_positions(app, existing_positions)
+        # get_ib_positions buckets by symbol; the abort closes everything
+        to_close = [(p.contract, p.position // 100)  # is // 100 needed??
+                    for p in chain.from_iterable(positions.values())]
+    # build every order first, then fire all placeOrder calls back to
+    # back (they return immediately) and flush them in one reactor
+    # tick, so the last leg isn't queued behind the first leg's pricing
+    orders = []
+    for contract, quantity in to_close:
+        price = calc_abort_price(app, contract, underlying)
+        orders.append((contract, LimitOrder(
             'SELL',
             quantity,
             price,
             sweepToFill=True,
             tif='DAY',
-            outsideRth=False)
-        app.ib.placeOrder(position.contract, order)
+            outsideRth=False)))
+    for contract, order in orders:
+        app.ib.placeOrder(contract, order)
+    app.ib.sleep(0)
     app._logger.info('aborted trade')
 
 
-def calc_abort_price(app: object, position: object,
+def calc_abort_price(app: object, contract: object,
                      underlying: object) -> float:
-    avg_cost = position.avgCost
-    # midpoint of bid-ask spread?
-    bsm_price = bsm.price_option(app.db, option, underlying)
-    pass
+    """price an abort sell. the midpoint of the bid-ask spread when
+       the leg has a live two-sided quote, floored at the bsm model
+       price so a crossed or collapsing book can't give the shares
+       away -- and so the order never goes out priceless."""
+    floor = bsm.price_option(app.db, contract, underlying, app.tz)
+    line = next((o for o in chain(underlying.straddle_options,
+                                  underlying.strangle_options)
+                 if o.contract.conId == contract.conId), None)
+    if line is not None and line.bid > 0 and line.ask > 0:
+        # nan (no tick yet) and ib's -1 (no quote) both fail the guards
+        return max((line.bid + line.ask) / 2, floor)
+    return floor
 
 
 def sell(ib: object, db: object, tz: object, underlying: object,
          account: object, positions: list[object]) -> None:
-    """Entry point to liquidation of a straddle position. Iterate
-       through positions, validate each position, then place orders
-       until the position is liquidated."""
+    """Entry point to liquidation of a straddle position for callers
+       already on the ib loop's thread; monitor tasks instead post
+       sell_async onto that loop themselves."""
+    ib.run(sell_async(ib, db, tz, underlying, account, positions))
+
+
+async def sell_async(ib: object, db: object, tz: object,
+                     underlying: object, account: object,
+                     positions: list[object]) -> None:
+    """validate every position up front, then liquidate all legs
+       concurrently, each placing orders until its position is closed.
+       must run on the loop driving the ib reactor: handle_order awaits
+       statusEvent, whose wakeups fire on that loop's thread."""
     for position in positions:
         validate.validate_sell(db, position, underlying, tz)
-        # TODO: modify position.sell_price to be option.locked_bid
-        #       option to have locked_bid in the same was as BUY's locked_ask
-        order = build_order('SELL', position.quantity, position.sell_price)
-        contract = position.contract or position.data_line.contract
-        filled = execute(ib, db, account, contract, order)
-        while filled < position.quantity:
-            # continue to execute until the position is closed.
-            order.totalQuantity = position.quantity - filled
-            filled += execute(ib, db, account, contract, order)
+    await asyncio.gather(
+        *(_sell_position(ib, db, account, position)
+          for position in positions))
+
+
+async def _sell_position(ib: object, db: object, account: object,
+                         position: object) -> None:
+    # TODO: modify position.sell_price to be option.locked_bid
+    #       option to have locked_bid in the same was as BUY's locked_ask
+    order = build_order('SELL', position.quantity, position.sell_price)
+    contract = position.contract or position.data_line.contract
+    account_num = account.app.account_num
+    filled = await execute_async(ib, db, account_num, contract, order)
+    while filled < position.quantity:
+        # continue to execute until the position is closed.
+        order.totalQuantity = position.quantity - filled
+        filled += await execute_async(ib, db, account_num, contract, order)
+
+
+_ROW_FIELDS = itemgetter('symbol', 'expiration', 'strike', 'right',
+                         'exchange', 'multiplier')
 
 
 def parse_row(row: object) -> Option:
-    """Parse the sqlite3.Row object and return an ib-insync Option object"""
-    symbol = row['symbol']
-    strike = row['strike']
-    right = row['right']
-    exchange = row['exchange']
-    exp = row['expiration']
-    multiplier = row['multiplier']
-    return Option(symbol, exp, strike, right, exchange, multiplier, 'USD')
+    """Parse the sqlite3.Row object and return an ib-insync Option
+       object. itemgetter fetches all six columns in one C-level call
+       instead of six separate Row name lookups."""
+    return Option(*_ROW_FIELDS(row), 'USD')
 
 
 def find_option(app: object, row: object) -> Option:
@@ -8,6 +8,21 @@ from ib_insync.ibcontroller import IBC, Watchdog
 
 _logger = logging.getLogger(__name__)
 
+# ZoneInfo construction goes through the tzdata registry (dict lookup
+# plus a lock) on every call; bind the default zone once
+_NY = ZoneInfo('America/New_York')
+
+# mcal calendar objects reparse their holiday rules on construction
+# (tens of ms) and are immutable, so build each exchange's once
+_calendars = {}
+
+
+def _get_calendar(exchange: str) -> object:
+    cal = _calendars.get(exchange)
+    if cal is None:
+        cal = _calendars[exchange] = mcal.get_calendar(exchange)
+    return cal
+
 
 def clean_exchange(exchange: str) -> str:
     """Refactor exchange inputs to match what mcal expects"""
@@ -17,7 +32,7 @@ def clean_exchange(exchange: str) -> str:
 
 
 def get_schedule(exchange: str,
-                 tz: ZoneInfo = ZoneInfo('America/New_York'),
+                 tz: ZoneInfo = _NY,
                  end: datetime or str = None) -> tuple[datetime]:
     """Return the market open and close times in EST of the given exchange,
        whose tz may differ, as is the case of CBOE given natively in CST.
@@ -30,7 +45,7 @@ def get_schedule(exchange: str,
         end = start
     exchange = clean_exchange(exchange)
     try:
-        schedule = mcal.get_calendar(exchange).schedule(
+        schedule = _get_calendar(exchange).schedule(
             start_date=start, end_date=end, tz=str(tz))
     except ValueError as e:
         _logger.exception(e)
@@ -44,7 +59,7 @@ def get_schedule(exchange: str,
     return o, c
 
 
-def get_now(tz: ZoneInfo = ZoneInfo('America/New_York')):
+def get_now(tz: ZoneInfo = _NY):
     return datetime.now(tz=tz).replace(tzinfo=None)
 
 